@@ -1,13 +1,22 @@
+import io
 import os
 import sys
 import json
-import ast
+import time
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any, Set
-from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, Iterator, List, TextIO, Tuple, Optional, Any, Union
+from dataclasses import dataclass, field, fields, asdict
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from review_common import (
+    CACHE_DIR_NAME, DEFAULT_READ_AHEAD, GENERATED_POLICIES, LARGE_FILE_BYTES, AnalysisCache, Buffer, ByteLines,
+    ChangeWatcher, CompiledRuleSet, IgnoreRules, IssueTally, LineIndex, MappedFile, SourceFile, StreamedArray,
+    compile_rules, generated_reason, git_changed_lines, iter_files, iter_line_spans, lexed_lines_of_code, load_source,
+    prefetch, rules_fingerprint, walk_project, write_json_object,
+)
 
 
 @dataclass
@@ -89,6 +98,15 @@ class CodeReviewAnalyzer:
         'VeteranServices.tsx',
     ]
 
+    # Directories never reviewed
+    EXCLUDED_DIRS = {
+        'node_modules', '.git', 'dist', 'build', 'coverage', '.qodo', 'ai_logic_review', '__pycache__',
+        'test', 'tests', CACHE_DIR_NAME,
+    }
+
+    # Seconds between cache writes while watching (the cache is always saved on exit)
+    CACHE_SAVE_INTERVAL = 30.0
+
     # Properties 4 Creation Mission Prompt for AI Context
     P4C_MISSION = """
     Properties 4 Creation MISSION: Housing veterans and families with dignity.
@@ -102,8 +120,16 @@ class CodeReviewAnalyzer:
     Quality is not just syntax—it's about serving those who served us.
     """
 
-    def __init__(self, source_folder: str):
+    def __init__(self, source_folder: str, jobs: int = 1, use_cache: bool = False, cache_dir: Optional[str] = None,
+                 use_gitignore: bool = False, read_ahead: int = DEFAULT_READ_AHEAD, generated_files: str = 'bytes'):
         self.source_folder = Path(source_folder)
+        self.ignore_rules = IgnoreRules(self.source_folder, dir_names=self.EXCLUDED_DIRS, use_gitignore=use_gitignore)
+        # Worker processes for file analysis (1 = serial, 0 = one per CPU)
+        self.jobs = jobs or os.cpu_count() or 1
+        # Files read concurrently ahead of the analysis (1 = read serially)
+        self.read_ahead = read_ahead
+        # Large/generated artifacts: 'skip', 'bytes' (mapped, scanned undecoded) or 'full' (treated as source)
+        self.generated_files = generated_files
         self.project_analysis = ProjectAnalysis(
             project_name=source_folder.split('/')[-1] or source_folder.split('\\')[-1],
             timestamp=datetime.now().isoformat()
@@ -222,6 +248,33 @@ class CodeReviewAnalyzer:
              'Component should use AuthContext for secure veteran applications'),
         ]
 
+        # Git scope (--since/--staged): file -> changed line ranges, None = whole file
+        self.git_scope: Optional[Dict[Path, Optional[List[Tuple[int, int]]]]] = None
+        self._git_query: Optional[Tuple[Optional[str], bool, bool]] = None
+
+        # Running issue counts of the last run_analysis/watch batch
+        self.tally = IssueTally()
+
+        # Progress messages; the CLI points this at stderr when the report itself goes to stdout.
+        # None means print() resolves sys.stdout per message, so redirect_stdout() callers capture it.
+        self.log: Optional[TextIO] = None
+
+        # Incremental cache: unchanged files reuse their stored FileAnalysis
+        self.cache: Optional[AnalysisCache] = None
+        if use_cache:
+            cache_root = Path(cache_dir) if cache_dir else self.source_folder / CACHE_DIR_NAME
+            self.cache = AnalysisCache(
+                cache_root / 'code-review.json',
+                rules_fingerprint(Path(__file__).read_bytes(), self.compiled_rules().rules, self.HIGH_STAKES_COMPONENTS,
+                                  self.generated_files)
+            )
+
+    def __getstate__(self):
+        # Worker processes never consult the cache, so don't ship it to them
+        state = self.__dict__.copy()
+        state['cache'] = None
+        return state
+
     def _generate_project_manifest(self) -> Dict[str, Any]:
         """Generate project manifest with Properties 4 Creation-specific context for AI analysis."""
         return {
@@ -260,32 +313,39 @@ class CodeReviewAnalyzer:
                 return lang
         return 'unknown'
 
-    def count_lines_of_code(self, content: str) -> int:
-        """Count lines of code (excluding empty lines and comments)."""
-        lines = content.split('\n')
+    def count_lines_of_code(self, content: Union[str, Buffer]) -> int:
+        """Count lines of code (excluding empty lines and comments) for languages the lexer does not cover.
+
+        Takes the text, or the raw bytes of a generated (possibly mapped) file,
+        which are scanned in place instead of decoded.
+        """
+        if isinstance(content, str):
+            block_open, block_close, line_comment, hash_comment = '/*', '*/', '//', '#'
+        else:
+            block_open, block_close, line_comment, hash_comment = b'/*', b'*/', b'//', b'#'
         code_lines = 0
         in_multiline_comment = False
-        
-        for line in lines:
-            stripped = line.strip()
-            
+
+        for start, end in iter_line_spans(content):
             # Handle multiline comments
-            if '/*' in stripped and '*/' not in stripped:
+            opens = content.find(block_open, start, end) >= 0
+            closes = content.find(block_close, start, end) >= 0
+            if opens and not closes:
                 in_multiline_comment = True
                 continue
-            if '*/' in stripped:
+            if closes:
                 in_multiline_comment = False
                 continue
-            
+
             if in_multiline_comment:
                 continue
-            
+
             # Skip empty lines and pure comments
-            if not stripped or stripped.startswith('//') or stripped.startswith('#'):
+            if start == end or content[start:start + 2] == line_comment or content[start:start + 1] == hash_comment:
                 continue
-            
+
             code_lines += 1
-        
+
         return code_lines
 
     def count_functions(self, content: str, language: str) -> int:
@@ -307,13 +367,36 @@ class CodeReviewAnalyzer:
         """Count the number of imports in the file."""
         return len(re.findall(r'^import\s+', content, re.MULTILINE))
 
-    def analyze_file(self, file_path: Path) -> FileAnalysis:
-        """Analyze a single file and return results."""
+    def compiled_rules(self, binary: bool = False) -> CompiledRuleSet:
+        """Return every rule set merged into one scanner, compiled once per process (bytes patterns if binary)."""
+        all_patterns = [
+            self.security_patterns,
+            self.performance_patterns,
+            self.typescript_patterns,
+            self.architecture_patterns,
+            self.accessibility_patterns,
+            self.dignity_first_patterns,
+            self.gemini_service_patterns,
+            self.context_patterns,
+        ]
+        return compile_rules(tuple(rule for patterns in all_patterns for rule in patterns), re.MULTILINE, binary)
+
+    def analyze_file(self, file_path: Path, source: Optional[Union[SourceFile, MappedFile]] = None) -> FileAnalysis:
+        """Analyze a single file and return results (reads it unless already loaded)."""
         language = self.detect_language(file_path)
         
+        owned = source is None
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            if source is None:
+                source = self._read(file_path)
+            reason = generated_reason(source) if self.generated_files != 'full' else None
+            if reason:
+                try:
+                    return self._analyze_generated(file_path, language, source, reason)
+                finally:
+                    if owned:
+                        source.close()
+            content = source.text
         except Exception as e:
             return FileAnalysis(
                 path=str(file_path),
@@ -329,52 +412,80 @@ class CodeReviewAnalyzer:
                 )]
             )
 
+        # JS/TS/CSS go through the shared lexer: LOC from its spans, rules on the
+        # comment-blanked code (same offsets, so line numbers and snippets still line up)
+        lexed = source.lexed
+        code = lexed.code if lexed else content
         analysis = FileAnalysis(
             path=str(file_path),
             language=language,
-            lines_of_code=self.count_lines_of_code(content)
+            lines_of_code=lexed.lines_of_code if lexed else self.count_lines_of_code(content)
         )
 
         # Calculate metrics
         analysis.metrics = {
-            'functions': self.count_functions(content, language),
-            'imports': self.count_imports(content),
-            'file_size': file_path.stat().st_size,
+            'functions': self.count_functions(code, language),
+            'imports': self.count_imports(code),
+            'file_size': source.size,
             'has_typescript': language == 'typescript',
         }
 
-        # Run pattern checks
-        all_patterns = [
-            (self.security_patterns, 'security'),
-            (self.performance_patterns, 'performance'),
-            (self.typescript_patterns, 'type-safety'),
-            (self.architecture_patterns, 'architecture'),
-            (self.accessibility_patterns, 'accessibility'),
-            (self.dignity_first_patterns, 'dignity-first'),
-            (self.gemini_service_patterns, 'gemini-service'),
-            (self.context_patterns, 'context-usage'),
-        ]
+        # Run pattern checks (all rule sets in one precompiled scan)
+        line_index = LineIndex(content)
+        for (pattern, severity, cat, message), start in self.compiled_rules().iter_matches(code):
+            line_no = line_index.line_number(start)
+            snippet = line_index.line(line_no)
+
+            analysis.issues.append(FileIssue(
+                severity=severity,
+                category=cat,
+                file=str(file_path),
+                line=line_no,
+                message=message,
+                suggestion=f'Review line {line_no} for {cat} issue',
+                code_snippet=snippet.strip() if snippet else None
+            ))
 
-        for patterns, category in all_patterns:
-            for pattern, severity, cat, message in patterns:
-                matches = list(re.finditer(pattern, content, re.MULTILINE))
-                for match in matches:
-                    line_no = content[:match.start()].count('\n') + 1
-                    lines = content.split('\n')
-                    snippet = lines[line_no - 1] if line_no <= len(lines) else None
-                    
-                    analysis.issues.append(FileIssue(
-                        severity=severity,
-                        category=cat,
-                        file=str(file_path),
-                        line=line_no,
-                        message=message,
-                        suggestion=f'Review line {line_no} for {cat} issue',
-                        code_snippet=snippet.strip() if snippet else None
-                    ))
+        return analysis
+
+    def _analyze_generated(self, file_path: Path, language: str, source: Union[SourceFile, MappedFile],
+                           reason: str) -> FileAnalysis:
+        """Review a build/tool artifact on its raw (possibly mapped) bytes, decoding only reported snippets."""
+        analysis = FileAnalysis(path=str(file_path), language=language, lines_of_code=0)
+        analysis.metrics = {
+            'functions': 0,
+            'imports': 0,
+            'file_size': source.size,
+            'has_typescript': language == 'typescript',
+            'generated': reason,
+        }
+        if self.generated_files == 'skip':
+            analysis.metrics['skipped'] = True
+            return analysis
+
+        lines = ByteLines(source.data)
+        analysis.lines_of_code = self._generated_loc(file_path, source.data)
+        for (pattern, severity, cat, message), start in self.compiled_rules(binary=True).iter_matches(source.data):
+            line_no = lines.line_number(start)
+            snippet = lines.snippet(start).strip()
+
+            analysis.issues.append(FileIssue(
+                severity=severity,
+                category=cat,
+                file=str(file_path),
+                line=line_no,
+                message=message,
+                suggestion=f'Review line {line_no} for {cat} issue',
+                code_snippet=snippet or None
+            ))
 
         return analysis
 
+    def _generated_loc(self, file_path: Path, data: Buffer) -> int:
+        """LOC of a build artifact by the same definition analyze_file uses for source, counted on the raw bytes."""
+        loc = lexed_lines_of_code(file_path, data)
+        return loc if loc is not None else self.count_lines_of_code(data)
+
     def check_imports_for_architecture(self, file_path: Path, content: str) -> List[FileIssue]:
         """Check imports for architectural violations with path-aware enforcement."""
         issues = []
@@ -439,18 +550,113 @@ class CodeReviewAnalyzer:
 
         return issues
 
-    def calculate_quality_score(self, analyses: List[FileAnalysis]) -> Tuple[int, List[str]]:
-        """Calculate overall project quality score and recommendations."""
+    def analyze_path(self, file_path: Path, source: Optional[Union[SourceFile, MappedFile]] = None) -> FileAnalysis:
+        """Run the pattern and architecture checks for one file, reading it at most once."""
+        owned = source is None
+        if source is None:
+            source = self._load_source(file_path)
+        try:
+            analysis = self.analyze_file(file_path, source)
+
+            # Check for architecture violations in imports (generated files have none worth checking)
+            if isinstance(source, SourceFile) and 'generated' not in analysis.metrics:
+                code = source.lexed.code if source.lexed else source.text
+                arch_issues = self.check_imports_for_architecture(file_path, code)
+                analysis.issues.extend(arch_issues)
+        finally:
+            if owned and source is not None:
+                source.close()
+
+        return analysis
+
+    def _read(self, file_path: Path) -> Union[SourceFile, MappedFile]:
+        """Load a file, mapping it instead when it is too large to be source (unless generated_files='full')."""
+        return load_source(file_path, LARGE_FILE_BYTES if self.generated_files != 'full' else float('inf'))
+
+    def _load_source(self, file_path: Path) -> Optional[Union[SourceFile, MappedFile]]:
+        try:
+            return self._read(file_path)
+        except Exception:
+            return None  # analyze_file reports the read error
+
+    def _stage_files(self, files: List[Path]) -> Iterator[Tuple[Path, Optional[SourceFile], Optional[str], Optional[Dict]]]:
+        """Load each file once and look it up in the cache: (path, source, digest, cached result).
+
+        Reads run up to read_ahead files ahead on threads while earlier files are analyzed.
+        """
+        for file_path, pending in prefetch(files, self._load_source, self.read_ahead):
+            source = pending.result()
+            digest = cached = None
+            if self.cache is not None and source is not None:
+                digest = self.cache.digest(source.data)
+                cached = self.cache.get(str(file_path), digest)
+            yield file_path, source, digest, cached
+
+    def _analyze_files(self, files: List[Path]) -> Iterator[FileAnalysis]:
+        """Yield one FileAnalysis per file, in input order, using a process pool when jobs > 1."""
+        staged = self._stage_files(files)
+        fresh: Optional[Iterator[FileAnalysis]] = None
+        pool = None
+        if self.jobs > 1 and len(files) > 1:
+            # Mapped files cannot be pickled and workers map them again themselves,
+            # so release each mapping as soon as the file is staged
+            staged = [(path, self._unmapped(source), digest, cached) for path, source, digest, cached in staged]
+            misses = [(path, source) for path, source, _, cached in staged if cached is None]
+            pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=(self,))
+            fresh = pool.map(_analyze_in_worker, misses, chunksize=max(1, len(misses) // (self.jobs * 4)))
+
+        try:
+            for file_path, source, digest, cached in staged:
+                try:
+                    if cached is not None:
+                        analysis = self._analysis_from_dict(cached)
+                    else:
+                        analysis = next(fresh) if fresh is not None else self.analyze_path(file_path, source)
+                        if digest is not None:
+                            self.cache.put(str(file_path), digest, asdict(analysis))
+                finally:
+                    if source is not None:
+                        source.close()
+                yield analysis
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    @staticmethod
+    def _unmapped(source: Optional[Union[SourceFile, MappedFile]]) -> Optional[SourceFile]:
+        """Close a mapped file and return None in its place; read files pass through."""
+        if isinstance(source, MappedFile):
+            source.close()
+            return None
+        return source
+
+    @staticmethod
+    def _analysis_from_dict(data: Dict[str, Any]) -> FileAnalysis:
+        """Rebuild a FileAnalysis from its asdict() form."""
+        return FileAnalysis(**{**data, 'issues': [FileIssue(**issue) for issue in data['issues']]})
+
+    @staticmethod
+    def tally_analyses(analyses: List[FileAnalysis]) -> IssueTally:
+        tally = IssueTally()
+        for analysis in analyses:
+            tally.add(analysis.path, analysis.issues, analysis.lines_of_code, analysis.language)
+        return tally
+
+    def calculate_quality_score(self, analyses: List[FileAnalysis],
+                                tally: Optional[IssueTally] = None) -> Tuple[int, List[str]]:
+        """Calculate overall project quality score and recommendations (from `tally` when given)."""
         if not analyses:
             return 0, ['No files analyzed']
+        if tally is None:
+            tally = self.tally_analyses(analyses)
 
         score = 100
         recommendations = []
 
-        total_issues = sum(len(a.issues) for a in analyses)
-        critical_issues = sum(1 for a in analyses for i in a.issues if i.severity == 'CRITICAL')
-        high_issues = sum(1 for a in analyses for i in a.issues if i.severity == 'HIGH')
-        medium_issues = sum(1 for a in analyses for i in a.issues if i.severity == 'MEDIUM')
+        total_issues = tally.issues
+        critical_issues = tally.by_severity['CRITICAL']
+        high_issues = tally.by_severity['HIGH']
+        medium_issues = tally.by_severity['MEDIUM']
 
         # Deduct for issues
         score -= critical_issues * 15
@@ -459,7 +665,7 @@ class CodeReviewAnalyzer:
         score -= (total_issues - critical_issues - high_issues - medium_issues) * 1
 
         # Bonus for TypeScript (type safety)
-        ts_count = sum(1 for a in analyses if a.language == 'typescript')
+        ts_count = tally.by_language['typescript']
         if ts_count > 0:
             score += 5
 
@@ -477,49 +683,89 @@ class CodeReviewAnalyzer:
             recommendations.append('ℹ️ Consider using TypeScript for better type safety')
 
         # Properties 4 Creation-specific recommendations
-        accessibility_issues = sum(1 for a in analyses for i in a.issues if i.category == 'accessibility')
+        accessibility_issues = tally.by_category['accessibility']
         if accessibility_issues > 0:
             recommendations.append(f'♿ ACCESSIBILITY: {accessibility_issues} issues found - veterans may have disabilities')
 
         return score, recommendations
 
-    def run_analysis(self) -> ProjectAnalysis:
-        """Run complete project analysis."""
-        print(f"🔍 Analyzing project: {self.project_analysis.project_name}")
-        print(f"📋 Properties 4 Creation Mission: {self.manifest['mission_statement']}")
-        
-        # Collect files
-        extensions = []
-        for config in self.language_handlers.values():
-            extensions.extend(config['extensions'])
+    def limit_to_git_changes(self, since: Optional[str] = None, staged: bool = False, changed_lines: bool = False):
+        """Review only files changed since `since` (or staged), optionally only findings on changed lines."""
+        root = self.source_folder.resolve()
+        self._git_query = (since, staged, changed_lines)
+        self.git_scope = {}
+        for path, ranges in git_changed_lines(self.source_folder, since=since, staged=staged).items():
+            try:
+                file_path = self.source_folder / path.relative_to(root)
+            except ValueError:
+                continue
+            if self.is_reviewable(file_path) and file_path.is_file():
+                self.git_scope[file_path] = ranges if changed_lines else None
+
+    def _filter_to_changed_lines(self, file_path: Path, analysis: FileAnalysis):
+        """Drop line findings outside the diff; file-level findings (no line) are kept."""
+        ranges = self.git_scope.get(file_path) if self.git_scope else None
+        if ranges is not None:
+            analysis.issues = [
+                issue for issue in analysis.issues
+                if issue.line is None or any(start <= issue.line <= end for start, end in ranges)
+            ]
+
+    def collect_files(self) -> List[Path]:
+        """Return every reviewable file under source_folder (or the git scope), sorted."""
+        if self.git_scope is not None:
+            return sorted(self.git_scope)
+        tree = walk_project(self.source_folder, self.ignore_rules)
+        return sorted(node.path for node in iter_files(tree) if self.detect_language(node.path) != 'unknown')
+
+    def in_scope(self, file_path: Path) -> bool:
+        """Whether this path is reviewable and inside the git scope, if there is one."""
+        return self.is_reviewable(file_path) and (self.git_scope is None or file_path in self.git_scope)
+
+    def is_reviewable(self, file_path: Path) -> bool:
+        """Whether collect_files would pick up this path."""
+        try:
+            rel_path = file_path.relative_to(self.source_folder).as_posix()
+        except ValueError:
+            return False
+        return self.detect_language(file_path) != 'unknown' and not self.ignore_rules.ignores(rel_path)
+
+    def run_analysis(self, on_file: Optional[Callable[[FileAnalysis], None]] = None) -> ProjectAnalysis:
+        """Run complete project analysis, passing each FileAnalysis to `on_file` as soon as it is ready."""
+        print(f"🔍 Analyzing project: {self.project_analysis.project_name}", file=self.log)
+        print(f"📋 Properties 4 Creation Mission: {self.manifest['mission_statement']}", file=self.log)
         
-        files = []
-        for root, dirs, filenames in os.walk(self.source_folder):
-            # Remove excluded directories
-            dirs[:] = [d for d in dirs if d not in ['node_modules', '.git', 'dist', 'build', 'coverage', '.qodo', 'ai_logic_review', '__pycache__', 'test', 'tests']]
-            
-            for filename in filenames:
-                file_path = Path(root) / filename
-                if file_path.suffix.lower() in extensions:
-                    files.append(file_path)
-
-        # Analyze each file
+        # Analyze each file (results come back in sorted path order either way)
         all_analyses = []
-        for file_path in sorted(files):
-            print(f"  📄 Analyzing: {file_path.relative_to(self.source_folder)}")
-            analysis = self.analyze_file(file_path)
-            
-            # Check for architecture violations in imports
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                arch_issues = self.check_imports_for_architecture(file_path, content)
-                analysis.issues.extend(arch_issues)
-            except:
-                pass
-            
+        self.tally = IssueTally()
+        files = self.collect_files()
+        for file_path, analysis in zip(files, self._analyze_files(files)):
+            print(f"  📄 Analyzing: {file_path.relative_to(self.source_folder)}", file=self.log)
+            self._filter_to_changed_lines(file_path, analysis)
             all_analyses.append(analysis)
-            self.project_analysis.file_analyses.append(analysis)
+            self.tally.add(analysis.path, analysis.issues, analysis.lines_of_code, analysis.language)
+            if on_file is not None:
+                on_file(analysis)
+
+        if self.cache is not None:
+            self.cache.save()
+            print(f"💾 {self.cache.summary()}", file=self.log)
+
+        return self._summarize(all_analyses, self.tally)
+
+    def _summarize(self, all_analyses: List[FileAnalysis], tally: Optional[IssueTally] = None) -> ProjectAnalysis:
+        """Roll per-file results up into project_analysis (categories, summary, score).
+
+        Counts come from `tally` (kept up to date by run_analysis and watch);
+        without one it is built here in a single pass.
+        """
+        if tally is None:
+            tally = self.tally_analyses(all_analyses)
+        self.project_analysis = ProjectAnalysis(
+            project_name=self.project_analysis.project_name,
+            timestamp=self.project_analysis.timestamp,
+            file_analyses=list(all_analyses),
+        )
 
         # Categorize issues
         for analysis in all_analyses:
@@ -536,36 +782,94 @@ class CodeReviewAnalyzer:
                     self.project_analysis.dignity_first_violations.append(issue)
 
         # Calculate summary
-        total_loc = sum(a.lines_of_code for a in all_analyses)
         self.project_analysis.summary = {
             'total_files': len(all_analyses),
-            'total_lines_of_code': total_loc,
-            'total_issues': sum(len(a.issues) for a in all_analyses),
-            'critical_issues': sum(1 for a in all_analyses for i in a.issues if i.severity == 'CRITICAL'),
-            'high_issues': sum(1 for a in all_analyses for i in a.issues if i.severity == 'HIGH'),
-            'medium_issues': sum(1 for a in all_analyses for i in a.issues if i.severity == 'MEDIUM'),
-            'low_issues': sum(1 for a in all_analyses for i in a.issues if i.severity == 'LOW'),
+            'total_lines_of_code': tally.lines_of_code,
+            'total_issues': tally.issues,
+            'critical_issues': tally.by_severity['CRITICAL'],
+            'high_issues': tally.by_severity['HIGH'],
+            'medium_issues': tally.by_severity['MEDIUM'],
+            'low_issues': tally.by_severity['LOW'],
             'files_by_language': defaultdict(int),
-            'files_with_issues': sum(1 for a in all_analyses if a.issues)
+            'files_with_issues': tally.files_with_issues
         }
 
         for a in all_analyses:
             self.project_analysis.summary['files_by_language'][a.language] += 1
+        # Plain dict so asdict() can serialize the summary
+        self.project_analysis.summary['files_by_language'] = dict(self.project_analysis.summary['files_by_language'])
 
         # Store manifest
         self.project_analysis.manifest = self.manifest
 
         # Calculate quality score
         self.project_analysis.quality_score, self.project_analysis.recommendations = \
-            self.calculate_quality_score(all_analyses)
+            self.calculate_quality_score(all_analyses, tally)
         
         self.project_analysis.total_issues = self.project_analysis.summary['total_issues']
 
         return self.project_analysis
 
-    def generate_ai_report(self) -> str:
+    def watch(self, on_update: Callable[[ProjectAnalysis], None], interval: float = 0.5):
+        """Review once, then re-review only changed files on every save until interrupted.
+
+        FileAnalysis results stay in memory keyed by path; each batch of
+        changes re-analyzes just those files, swaps their counts in the
+        IssueTally and hands the refreshed ProjectAnalysis to `on_update`.
+        With --since/--staged the git scope is re-read per batch, so files
+        enter or leave it and --changed-lines follows the edited hunks.
+        """
+        on_update(self.run_analysis())
+        results = {Path(a.path): a for a in self.project_analysis.file_analyses}
+        watcher = ChangeWatcher(self.source_folder, lambda name: name in self.EXCLUDED_DIRS, interval=interval)
+        print(f"👀 Watching {self.source_folder} ({watcher.backend}) - press Ctrl+C to stop", file=self.log)
+        unsaved, saved_at = False, time.perf_counter()
+        try:
+            for changed in watcher.changes():
+                started = time.perf_counter()
+                if self._git_query is not None:
+                    self.limit_to_git_changes(*self._git_query)
+                # Deleted files, and directories whose files may be gone without events of their own
+                vanished = {path for path in changed if not path.is_file()}
+                removed = {
+                    path for path in results
+                    if ((path in vanished or not vanished.isdisjoint(path.parents)) and not path.is_file())
+                    or (self.git_scope is not None and path not in self.git_scope)
+                }
+                rerun = sorted(path for path in changed if path.is_file() and self.in_scope(path))
+                if not removed and not rerun:
+                    continue
+                for path in removed.union(rerun):
+                    stale = results.pop(path, None)
+                    if stale is not None:
+                        self.tally.remove(stale.path)
+                for path, analysis in zip(rerun, self._analyze_files(rerun)):
+                    self._filter_to_changed_lines(path, analysis)
+                    results[path] = analysis
+                    self.tally.add(analysis.path, analysis.issues, analysis.lines_of_code, analysis.language)
+                # Rewriting the whole JSON cache per save is costly, so flush at most every CACHE_SAVE_INTERVAL
+                unsaved = self.cache is not None
+                if unsaved and time.perf_counter() - saved_at >= self.CACHE_SAVE_INTERVAL:
+                    self.cache.save()
+                    unsaved, saved_at = False, time.perf_counter()
+
+                self.project_analysis.timestamp = datetime.now().isoformat()
+                analysis = self._summarize([results[path] for path in sorted(results)], self.tally)
+                on_update(analysis)
+                elapsed = time.perf_counter() - started
+                print(f"🔁 Re-reviewed {len(rerun)} file(s), dropped {len(removed - set(rerun))} in {elapsed:.2f}s - "
+                      f"score {analysis.quality_score}/100, {analysis.total_issues} issues", file=self.log)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            if unsaved:
+                self.cache.save()
+
+    def generate_ai_report(self, analysis: Optional[ProjectAnalysis] = None) -> str:
         """Generate a comprehensive AI-readable report with Properties 4 Creation context."""
-        analysis = self.run_analysis()
+        if analysis is None:
+            analysis = self.run_analysis()
         
         report = []
         report.append("=" * 80)
@@ -655,15 +959,90 @@ class CodeReviewAnalyzer:
         
         return '\n'.join(report)
 
+    # Category lists on ProjectAnalysis that repeat issues already held in file_analyses
+    CATEGORY_LISTS = (
+        'architectural_issues',
+        'security_issues',
+        'performance_issues',
+        'accessibility_issues',
+        'dignity_first_violations',
+    )
+
     def generate_json_report(self) -> str:
         """Generate a JSON report for programmatic consumption."""
-        analysis = self.run_analysis()
-        return json.dumps(asdict(analysis), indent=2)
+        buffer = io.StringIO()
+        self.write_json_report(buffer)
+        return buffer.getvalue()
+
+    def write_json_report(self, stream: TextIO, category_refs: bool = False,
+                          analysis: Optional[ProjectAnalysis] = None):
+        """Stream the JSON report to `stream` one issue/file at a time.
+
+        The output matches json.dumps(asdict(analysis), indent=2) without the
+        deep copy or the giant string. With category_refs, category lists hold
+        [file_index, issue_index] references into file_analyses instead of
+        duplicated issue objects.
+        """
+        if analysis is None:
+            analysis = self.run_analysis()
+        refs = self._issue_refs(analysis) if category_refs else None
+
+        def value_of(name: str) -> Any:
+            value = getattr(analysis, name)
+            if name == 'file_analyses':
+                return StreamedArray(asdict(a) for a in value)
+            if name in self.CATEGORY_LISTS:
+                if refs is not None:
+                    return StreamedArray(list(refs[id(issue)]) for issue in value)
+                return StreamedArray(asdict(issue) for issue in value)
+            return value
+
+        write_json_object(stream, ((f.name, value_of(f.name)) for f in fields(analysis)))
+
+    def write_ndjson_report(self, stream: TextIO):
+        """Stream an NDJSON report: one `file` record per file as it is analyzed, then one `summary` record.
+
+        The summary's category lists are [file_index, issue_index] references
+        into the file records, in file order.
+        """
+        def emit_file(file_analysis: FileAnalysis):
+            stream.write(json.dumps({'type': 'file', **asdict(file_analysis)}) + '\n')
+
+        analysis = self.run_analysis(on_file=emit_file)
+        refs = self._issue_refs(analysis)
+        record: Dict[str, Any] = {'type': 'summary'}
+        for f in fields(analysis):
+            if f.name == 'file_analyses':
+                continue
+            value = getattr(analysis, f.name)
+            record[f.name] = [list(refs[id(issue)]) for issue in value] if f.name in self.CATEGORY_LISTS else value
+        stream.write(json.dumps(record) + '\n')
+
+    @staticmethod
+    def _issue_refs(analysis: ProjectAnalysis) -> Dict[int, Tuple[int, int]]:
+        """Map each issue object to its (file_index, issue_index) position in file_analyses."""
+        return {
+            id(issue): (file_index, issue_index)
+            for file_index, file_analysis in enumerate(analysis.file_analyses)
+            for issue_index, issue in enumerate(file_analysis.issues)
+        }
+
+
+# Analyzer copy held by each worker process in --jobs mode
+_worker_analyzer: Optional[CodeReviewAnalyzer] = None
+
+
+def _init_worker(analyzer: CodeReviewAnalyzer) -> None:
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+
+def _analyze_in_worker(item: Tuple[Path, Optional[SourceFile]]) -> FileAnalysis:
+    return _worker_analyzer.analyze_path(*item)
 
 
 if __name__ == "__main__":
     import argparse
-    import codecs
     
     # Set UTF-8 encoding for Windows
     if sys.platform == 'win32':
@@ -673,21 +1052,74 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description='Properties 4 Creation AI-Optimized Code Review Tool')
     parser.add_argument('source', nargs='?', default='.', help='Source folder to analyze')
-    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    output_format = parser.add_mutually_exclusive_group()
+    output_format.add_argument('--json', action='store_true', help='Output as JSON')
+    output_format.add_argument('--ndjson', action='store_true',
+                               help='Stream one JSON record per file, then a summary record')
+    parser.add_argument('--category-refs', action='store_true',
+                        help='With --json, write category lists as [file_index, issue_index] references')
     parser.add_argument('--output', '-o', help='Output file path')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Worker processes for file analysis (0 = one per CPU)')
+    parser.add_argument('--read-ahead', type=int, default=DEFAULT_READ_AHEAD,
+                        help='Files read concurrently ahead of the analysis, for slow or network filesystems (1 = serial)')
+    parser.add_argument('--generated-files', choices=GENERATED_POLICIES, default='bytes',
+                        help=f'Large (>{LARGE_FILE_BYTES // 1024} KB) or generated files: skip them, scan their raw bytes '
+                             'without decoding (default), or analyze them like source')
+    parser.add_argument('--cache', action='store_true', help='Reuse results for unchanged files between runs')
+    parser.add_argument('--cache-dir', help=f'Cache location (default: <source>/{CACHE_DIR_NAME})')
+    parser.add_argument('--watch', action='store_true', help='Keep running and re-review files as they are saved')
+    parser.add_argument('--gitignore', action='store_true', help='Also skip files matched by .gitignore')
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--since', metavar='GIT_REF', help='Review only files changed since GIT_REF (e.g. origin/main)')
+    scope.add_argument('--staged', action='store_true', help='Review only files staged for commit')
+    parser.add_argument('--changed-lines', action='store_true',
+                        help='With --since/--staged, report only findings on changed lines')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='Seconds between scans when inotify is unavailable')
     
     args = parser.parse_args()
     
-    analyzer = CodeReviewAnalyzer(args.source)
+    analyzer = CodeReviewAnalyzer(args.source, jobs=args.jobs, use_cache=args.cache, cache_dir=args.cache_dir,
+                                  use_gitignore=args.gitignore, read_ahead=args.read_ahead,
+                                  generated_files=args.generated_files)
+    if args.since or args.staged:
+        try:
+            analyzer.limit_to_git_changes(since=args.since, staged=args.staged, changed_lines=args.changed_lines)
+        except RuntimeError as e:
+            parser.error(str(e))
     
-    if args.json:
-        report = analyzer.generate_json_report()
+    if args.watch:
+        def rewrite_report(analysis: ProjectAnalysis):
+            if not args.output:
+                return
+            with open(args.output, 'w', encoding='utf-8') as f:
+                if args.json:
+                    analyzer.write_json_report(f, category_refs=args.category_refs, analysis=analysis)
+                else:
+                    f.write(analyzer.generate_ai_report(analysis))
+
+        analyzer.watch(rewrite_report, interval=args.poll_interval)
+    elif args.json or args.ndjson:
+        # Stream straight to the destination instead of building the report in memory
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        if not args.output:
+            # Keep stdout parseable: progress goes to stderr
+            analyzer.log = sys.stderr
+        try:
+            if args.ndjson:
+                analyzer.write_ndjson_report(out)
+            else:
+                analyzer.write_json_report(out, category_refs=args.category_refs)
+        finally:
+            if args.output:
+                out.close()
+        if args.output:
+            print(f"Report saved to: {args.output}")
     else:
         report = analyzer.generate_ai_report()
-    
-    if args.output:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(report)
-        print(f"Report saved to: {args.output}")
-    else:
-        print(report)
+        
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(report)
+            print(f"Report saved to: {args.output}")
+        else:
+            print(report)
@@ -9,11 +9,20 @@ import os
 import sys
 import json
 import re
+import time
 from datetime import datetime
 from pathlib import Path
 from dataclasses import dataclass, field, asdict
+from bisect import bisect_left
 from typing import Dict, List, Optional, Any
 
+from review_common import (
+    CACHE_DIR_NAME, DEFAULT_READ_AHEAD, REPORT_COMPRESSIONS, AnalysisCache, ContextPacker, IgnoreRules, ImportGraph,
+    LexedSource, LineIndex, PackCandidate, ReviewHistory, SpillFile, StreamedArray, StreamedObject,
+    build_import_graph, decode_text, decompress_report, estimate_tokens, iter_files, lexer_dialect, open_report,
+    prefetch, rules_fingerprint, walk_project, write_json_object,
+)
+
 
 @dataclass
 class ProjectContext:
@@ -25,147 +34,321 @@ class ProjectContext:
     dependency_map: Dict[str, List[str]] = field(default_factory=dict)
 
 
+# Rule checks take the file's LexedSource and the file path and return the
+# offsets of the violations they found (file-level rules report at most one).
+# They match the original content through the code_* helpers, which skip
+# matches starting inside comments, so no comment-blanked copy is built.
+_STANDARD_RADIUS = re.compile(r'rounded-(xl|2xl|3xl|full|lg|md|sm)')
+_DATA_IMPORTS = ('from \'../data/', 'from "../data/', 'from \'./data/', 'from "./data/')
+_BUTTON_WITHOUT_LABEL = re.compile(r'<button[^>]*>(?!.*aria-label)', re.IGNORECASE)
+_ICON_ONLY_BUTTON = re.compile(r'<button[^>]*>\s*<[A-Z][^>]*\/?>\s*<\/button>')
+# `<img[^>]*(?<!alt=)[^>]*>` matches exactly the tags this does (the lookbehind
+# always passes right after `<img`), without its quadratic backtracking
+_IMG_TAG = re.compile(r'<img[^>]*>')
+_CONSOLE_CALL = re.compile(r'console\.(log|warn|error|info|debug)\(')
+_HEX_COLOR = re.compile(r'#[0-9A-Fa-f]{6}')
+_MAGIC_NUMBER = re.compile(r'(?<!\w)\d{3,}(?!\w)')
+_MAP_CALL = re.compile(r'\.map\s*\(')
+_ARROW_TO_ELEMENT = re.compile(r'=>\s*<(?:[A-Z][a-zA-Z0-9_]*|div|span|li)')
+_VALUE_PROP = re.compile(r'value|checked', re.IGNORECASE)
+_DEFAULT_PROP = re.compile(r'default(?:value|checked)', re.IGNORECASE)
+
+
+def _first_match(pattern: re.Pattern, source: LexedSource) -> List[int]:
+    match = source.code_search(pattern)
+    return [match.start()] if match else []
+
+
+def _first_of(source: LexedSource, needles) -> List[int]:
+    offsets = [offset for offset in (source.code_find(needle) for needle in needles) if offset >= 0]
+    return [min(offsets)] if offsets else []
+
+
+def _inconsistent_radius(source: LexedSource, file_path: str) -> List[int]:
+    if source.code_search(_STANDARD_RADIUS):
+        return []
+    return _first_of(source, ['rounded-'])
+
+
+def _data_layer_bypass(source: LexedSource, file_path: str) -> List[int]:
+    is_ui = any(x in file_path for x in ['pages', 'components', 'views'])
+    return _first_of(source, _DATA_IMPORTS) if is_ui else []
+
+
+def _icon_button_without_label(source: LexedSource, file_path: str) -> List[int]:
+    if not source.code_search(_BUTTON_WITHOUT_LABEL):
+        return []
+    return _first_match(_ICON_ONLY_BUTTON, source)
+
+
+def _image_without_alt(source: LexedSource, file_path: str) -> List[int]:
+    return _first_match(_IMG_TAG, source)
+
+
+def _any_type(source: LexedSource, file_path: str) -> List[int]:
+    return _first_of(source, [': any', 'as any'])
+
+
+def _console_statement(source: LexedSource, file_path: str) -> List[int]:
+    return _first_match(_CONSOLE_CALL, source)
+
+
+def _hardcoded_color(source: LexedSource, file_path: str) -> List[int]:
+    return [] if 'theme' in file_path.lower() else _first_match(_HEX_COLOR, source)
+
+
+def _magic_number(source: LexedSource, file_path: str) -> List[int]:
+    return _first_match(_MAGIC_NUMBER, source)
+
+
+def _try_without_catch(source: LexedSource, file_path: str) -> List[int]:
+    return [] if source.code_find('catch') >= 0 else _first_of(source, ['try {'])
+
+
+def _map_without_key(source: LexedSource, file_path: str) -> List[int]:
+    """`.map(... => <Element` renders with no `key=` before the element name.
+
+    Same matches as the lazy DOTALL `.map(...) => <Tag` regex this replaced: each
+    `.map(` pairs with the first arrow-to-element after it, found by bisecting
+    a list of arrows collected in one pass instead of rescanning the file.
+    """
+    arrows = [(m.start(), m.end()) for m in source.code_finditer(_ARROW_TO_ELEMENT)]
+    arrow_starts = [start for start, _ in arrows]
+    missing = []
+    pos = 0
+    while arrows:
+        call = source.code_search(_MAP_CALL, pos)
+        if call is None:
+            break
+        i = bisect_left(arrow_starts, call.end())
+        if i == len(arrows):
+            break
+        pos = arrows[i][1]
+        if source.code_find('key=', call.start(), pos) < 0:
+            missing.append(call.start())
+    return missing
+
+
+def _mixed_controlled_input(source: LexedSource, file_path: str) -> List[int]:
+    """Line-wise `<.*?(value|checked).*?(defaultValue|defaultChecked)`, case-insensitive, without backtracking.
+
+    Only lines holding a (rare) defaultValue/defaultChecked are looked at: the
+    first `<` on that line must be followed by value/checked ending before it.
+    """
+    content = source.content
+    for default in source.code_finditer(_DEFAULT_PROP):
+        line_start = content.rfind('\n', 0, default.start()) + 1
+        tag = source.code_find('<', line_start, default.start())
+        if tag >= 0 and source.code_search(_VALUE_PROP, tag + 1, default.start()):
+            return [tag]
+    return []
+
+
+# (check, severity, type, message), evaluated in order
+CODE_STANDARD_RULES = [
+    (_inconsistent_radius, "LOW", "UI_CONSISTENCY",
+     "Inconsistent border radius usage. Consider using standard Tailwind radius utilities."),
+    (_data_layer_bypass, "CRITICAL", "ARCH_BYPASS",
+     "UI component bypassing Data Access Layer. Use services/api layer instead."),
+    (_icon_button_without_label, "HIGH", "ACCESSIBILITY",
+     "Icon button missing aria-label. Screen readers require descriptive labels for interactive elements."),
+    (_image_without_alt, "HIGH", "ACCESSIBILITY",
+     "Image missing alt text. Provide meaningful alt attributes for screen reader accessibility."),
+    (_any_type, "MEDIUM", "TYPE_SAFETY",
+     "Usage of 'any' type detected. Define explicit interfaces for better type safety."),
+    (_console_statement, "LOW", "CLEAN_CODE",
+     "Console statement detected. Remove debug logs before production or use proper logging service."),
+    (_hardcoded_color, "LOW", "MAINTAINABILITY",
+     "Hardcoded hex color detected. Consider using theme constants or CSS variables."),
+    (_magic_number, "LOW", "MAINTAINABILITY",
+     "Magic number detected. Consider defining named constants for clarity."),
+    (_try_without_catch, "MEDIUM", "ERROR_HANDLING",
+     "Try block without catch detected. Ensure proper error handling for robust code."),
+    (_map_without_key, "LOW", "REACT_BEST_PRACTICE",
+     "Missing key prop in map/render. React uses keys to optimize rendering."),
+    (_mixed_controlled_input, "MEDIUM", "REACT_BEST_PRACTICE",
+     "Mixing controlled and uncontrolled components. Choose one approach consistently."),
+]
+
+# Interned rule table of compact reports: violations are [rule_id, line] pairs indexing it
+RULE_TABLE = [{"severity": severity, "type": v_type, "message": message}
+              for _, severity, v_type, message in CODE_STANDARD_RULES]
+
+# "format" marker of compact reports; verbose reports (one dict per violation) have none
+COMPACT_FORMAT = "context-review/compact-1"
+
+
+def expand_violations(pairs: List[List[int]], rules: List[Dict]) -> List[Dict]:
+    """[rule_id, line] pairs as the verbose {"severity", "type", "message", "line"} dicts."""
+    return [{**rules[rule_id], "line": line} for rule_id, line in pairs]
+
+
+def expand_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """The verbose shape of a compact report; verbose reports are returned unchanged."""
+    if report.get("format") != COMPACT_FORMAT:
+        return report
+    analysis = dict(report["analysis"])
+    rules = analysis.pop("rules")
+    analysis["files"] = [{**file_data, "violations": expand_violations(file_data["violations"], rules)}
+                         for file_data in analysis["files"]]
+    expanded = {key: value for key, value in report.items() if key != "format"}
+    expanded["analysis"] = analysis
+    return expanded
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """Read any context-review report (plain, gzip or zstd; compact or verbose) in the verbose shape."""
+    return expand_report(json.loads(decompress_report(Path(path).read_bytes())))
+
+
+def ingest_report(history: ReviewHistory, name: str, report: Dict[str, Any]) -> int:
+    """Add a compact or verbose report to the history store; returns its run id."""
+    analysis = report["analysis"]
+    if report.get("format") == COMPACT_FORMAT:
+        rules = analysis["rules"]
+        files = ((f["path"], f["violations"]) for f in analysis["files"])
+    else:
+        # Verbose reports repeat each rule per violation; intern them (reports before 016 have no lines)
+        index: Dict[tuple, int] = {}
+        files = []
+        for f in analysis["files"]:
+            pairs = []
+            for v in f["violations"]:
+                rule_id = index.setdefault((v["severity"], v["type"], v["message"]), len(index))
+                pairs.append((rule_id, v.get("line")))
+            files.append((f["path"], pairs))
+        rules = [{"severity": severity, "type": v_type, "message": message}
+                 for severity, v_type, message in index]
+    return history.ingest(name, analysis["timestamp"], analysis.get("project_root"), rules, files)
+
+
 class FullPictureAnalyzer:
     """Analyzes project structure and code quality for comprehensive review."""
+
+    # Same high-stakes list as code-review.py; these files are packed into the AI context first
+    HIGH_STAKES_COMPONENTS = [
+        'Application.tsx',
+        'AdminDashboard.tsx',
+        'TenantLogin.tsx',
+        'PropertyDetails.tsx',
+        'VeteranServices.tsx',
+    ]
+
+    # Leading characters of each file used as its "summary" when no token budget is set
+    SUMMARY_CHARS = 1000
+
+    # History store the history commands use without --history (relative to the cwd, like reports/)
+    DEFAULT_HISTORY = "reports/context_review_history.sqlite"
     
-    def __init__(self, source_folder: str, project_name: str = "Project"):
+    def __init__(self, source_folder: str, project_name: str = "Project",
+                 use_cache: bool = False, cache_dir: Optional[str] = None, use_gitignore: bool = False,
+                 jobs: int = 1, token_budget: Optional[int] = None, compact: bool = False,
+                 compression: Optional[str] = None, history: Optional[str] = None,
+                 read_ahead: int = DEFAULT_READ_AHEAD):
         self.source_folder = Path(source_folder)
+        # Files read concurrently ahead of the scan (1 = read serially)
+        self.read_ahead = read_ahead
+        # SQLite history store to ingest each report into (None = don't record)
+        self.history = history
+        # Tokens of packed source excerpts ("summary" fields) per report (None = first SUMMARY_CHARS of every file)
+        self.token_budget = token_budget
+        # Report layout: verbose (one dict per violation, what existing consumers read) or opt-in compact
+        # ([rule_id, line] violations, no indentation), optionally compressed
+        self.compact = compact
+        self.compression = compression
+        self.use_gitignore = use_gitignore
+        # Worker processes for import parsing (1 = serial, 0 = one per CPU)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.import_graph: Optional[ImportGraph] = None
+        # Files whose impact set limits generate_report (None = review everything)
+        self.impact_seeds: Optional[List[str]] = None
         self.context = ProjectContext(project_name=project_name)
         self.report_data = {
             "timestamp": datetime.now().isoformat(),
-            "project_root": str(self.source_folder.absolute()),
-            "files": []
+            "project_root": str(self.source_folder.absolute())
         }
+        # Incremental cache: unchanged files reuse their stored violations
+        self.cache: Optional[AnalysisCache] = None
+        self.import_cache: Optional[AnalysisCache] = None
+        if use_cache:
+            cache_root = Path(cache_dir) if cache_dir else self.source_folder / CACHE_DIR_NAME
+            self.cache = AnalysisCache(cache_root / 'context-review.json', rules_fingerprint(Path(__file__).read_bytes()))
+            self.import_cache = AnalysisCache(cache_root / 'import-graph.json', rules_fingerprint())
 
-    def remove_comments(self, content: str) -> str:
-        """Removes comments from code to reduce false positives."""
-        # Remove single-line comments
-        content = re.sub(r'//.*$', '', content, flags=re.MULTILINE)
-        # Remove multi-line comments
-        content = re.sub(r'/\*[\s\S]*?\*/', '', content)
-        return content
+    def remove_comments(self, content: str, file_path: str = '') -> str:
+        """Blanks out comments (offsets kept) to reduce false positives; strings are left intact."""
+        return LexedSource(content, lexer_dialect(file_path) or 'js').code
 
     def scan_project_structure(self):
         """Builds a map of how files relate to each other."""
-        exclude_dirs = {'node_modules', '.git', 'dist', 'build', 'coverage', '.next'}
+        exclude_dirs = {'node_modules', '.git', 'dist', 'build', 'coverage', '.next', CACHE_DIR_NAME}
+        rules = IgnoreRules(self.source_folder, dir_names=exclude_dirs, use_gitignore=self.use_gitignore)
         
-        for root, dirs, files in os.walk(self.source_folder):
-            # Skip excluded directories
-            dirs[:] = [d for d in dirs if d not in exclude_dirs]
-            
-            for f in files:
-                if f.endswith(('.tsx', '.ts', '.jsx', '.js')):
-                    rel_path = Path(root).relative_to(self.source_folder) / f
-                    self.context.dependency_map[str(rel_path)] = []
+        for node in iter_files(walk_project(self.source_folder, rules)):
+            if node.name.endswith(('.tsx', '.ts', '.jsx', '.js')):
+                self.context.dependency_map[str(Path(node.rel_path))] = []
+
+        # Resolve imports (relative, tsconfig aliases, index files) into the graph
+        self.import_graph = build_import_graph(self.source_folder, list(self.context.dependency_map),
+                                               jobs=self.jobs, cache=self.import_cache, read_ahead=self.read_ahead)
+        for file_path in self.context.dependency_map:
+            self.context.dependency_map[file_path] = self.import_graph.dependencies(file_path)
+        if self.import_cache is not None:
+            self.import_cache.save()
+
+    def graph_path(self, path: str) -> str:
+        """Normalize a user-supplied file path (absolute or relative to source_folder) to a dependency_map key."""
+        path = Path(path)
+        if path.is_absolute():
+            try:
+                path = path.resolve().relative_to(self.source_folder.resolve())
+            except ValueError:
+                raise ValueError(f"{path} is outside {self.source_folder}")
+        return str(path)
+
+    def impact(self, paths: List[str], direction: str = "dependents", max_depth: Optional[int] = None) -> List[str]:
+        """Files transitively connected to `paths` through imports, the given files first.
+
+        direction is "dependents" (files that may break when `paths` change),
+        "dependencies" (files `paths` rely on) or "both".
+        """
+        if self.import_graph is None:
+            self.scan_project_structure()
+        return self.import_graph.reachable(
+            [self.graph_path(p) for p in paths],
+            dependents=direction in ("dependents", "both"),
+            dependencies=direction in ("dependencies", "both"),
+            max_depth=max_depth,
+        )
+
+    def limit_to_impact_of(self, paths: List[str]):
+        """Make generate_report review only `paths` and their transitive dependents."""
+        self.impact_seeds = list(paths)
+
+    def scan_code_standards(self, content: str, file_path: str) -> List[List[int]]:
+        """Violations as [rule_id, line] pairs, rule_id indexing RULE_TABLE."""
+        # Rules skip matches inside comments (fewer false positives) on the original content
+        source = LexedSource(content, lexer_dialect(file_path) or 'js')
+        found = [(rule_id, offset) for rule_id, (check, _, _, _) in enumerate(CODE_STANDARD_RULES)
+                 for offset in check(source, file_path)]
+        if not found:
+            return []
+        line_index = LineIndex(content)
+        return [[rule_id, line_index.line_number(offset)] for rule_id, offset in found]
 
     def analyze_code_standards(self, content: str, file_path: str) -> List[Dict]:
         """Analyzes code for common issues and best practices."""
-        # Remove comments to reduce false positives
-        content = self.remove_comments(content)
-        violations = []
-        
-        # 1. UI Consistency - Border radius check
-        if 'rounded-' in content and not re.search(r'rounded-(xl|2xl|3xl|full|lg|md|sm)', content):
-            violations.append({
-                "severity": "LOW",
-                "type": "UI_CONSISTENCY",
-                "message": "Inconsistent border radius usage. Consider using standard Tailwind radius utilities."
-            })
-
-        # 2. Architectural Integrity (Data Layer Bypass)
-        is_ui = any(x in file_path for x in ['pages', 'components', 'views'])
-        if is_ui and any(pattern in content for pattern in ['from \'../data/', 'from "../data/', 'from \'./data/', 'from "./data/']):
-            violations.append({
-                "severity": "CRITICAL",
-                "type": "ARCH_BYPASS",
-                "message": "UI component bypassing Data Access Layer. Use services/api layer instead."
-            })
-
-        # 3. Accessibility - ARIA labels on interactive elements
-        # Check for buttons without aria-label
-        button_pattern = r'<button[^>]*>(?!.*aria-label)'
-        if re.search(button_pattern, content, re.IGNORECASE):
-            # More precise check - look for buttons with only icon content
-            icon_button_pattern = r'<button[^>]*>\s*<[A-Z][^>]*\/?>\s*<\/button>'
-            if re.search(icon_button_pattern, content):
-                violations.append({
-                    "severity": "HIGH",
-                    "type": "ACCESSIBILITY",
-                    "message": "Icon button missing aria-label. Screen readers require descriptive labels for interactive elements."
-                })
-
-        # 4. Accessibility - Images without alt text
-        img_without_alt = r'<img[^>]*(?<!alt=)[^>]*>'
-        if re.search(img_without_alt, content):
-            violations.append({
-                "severity": "HIGH",
-                "type": "ACCESSIBILITY",
-                "message": "Image missing alt text. Provide meaningful alt attributes for screen reader accessibility."
-            })
-
-        # 5. Type Safety - any type usage
-        if ': any' in content or 'as any' in content:
-            violations.append({
-                "severity": "MEDIUM",
-                "type": "TYPE_SAFETY",
-                "message": "Usage of 'any' type detected. Define explicit interfaces for better type safety."
-            })
-
-        # 6. Console statement checks (for production code)
-        console_pattern = r'console\.(log|warn|error|info|debug)\('
-        if re.search(console_pattern, content):
-            violations.append({
-                "severity": "LOW",
-                "type": "CLEAN_CODE",
-                "message": "Console statement detected. Remove debug logs before production or use proper logging service."
-            })
-
-        # 7. Hardcoded values that should be constants
-        hex_color_pattern = r'#[0-9A-Fa-f]{6}'
-        if re.search(hex_color_pattern, content) and 'theme' not in file_path.lower():
-            violations.append({
-                "severity": "LOW",
-                "type": "MAINTAINABILITY",
-                "message": "Hardcoded hex color detected. Consider using theme constants or CSS variables."
-            })
-
-        # 8. Magic numbers
-        magic_number_pattern = r'(?<!\w)\d{3,}(?!\w)'
-        if re.search(magic_number_pattern, content):
-            violations.append({
-                "severity": "LOW",
-                "type": "MAINTAINABILITY",
-                "message": "Magic number detected. Consider defining named constants for clarity."
-            })
-
-        # 9. Error handling
-        if 'try {' in content and 'catch' not in content:
-            violations.append({
-                "severity": "MEDIUM",
-                "type": "ERROR_HANDLING",
-                "message": "Try block without catch detected. Ensure proper error handling for robust code."
-            })
-
-        # 10. Missing key prop in map/render
-        map_pattern = r'\.map\s*\((.*?)\s*=>\s*<([A-Z][a-zA-Z0-9_]*|div|span|li)'
-        matches = re.finditer(map_pattern, content, re.DOTALL)
-        for match in matches:
-            if 'key=' not in match.group(0):
-                violations.append({
-                    "severity": "LOW",
-                    "type": "REACT_BEST_PRACTICE",
-                    "message": "Missing key prop in map/render. React uses keys to optimize rendering."
-                })
-
-        # 11. Uncontrolled to controlled component switch
-        uncontrolled_pattern = r'<.*?(value|checked).*?(defaultValue|defaultChecked)'
-        if re.search(uncontrolled_pattern, content, re.IGNORECASE):
-            violations.append({
-                "severity": "MEDIUM",
-                "type": "REACT_BEST_PRACTICE",
-                "message": "Mixing controlled and uncontrolled components. Choose one approach consistently."
-            })
+        return expand_violations(self.scan_code_standards(content, file_path), RULE_TABLE)
 
+    def _cached_violations(self, data: bytes, content: str, file_path: str) -> List[List[int]]:
+        """Run scan_code_standards, or reuse the cached result when the file is unchanged."""
+        if self.cache is None:
+            return self.scan_code_standards(content, file_path)
+        digest = self.cache.digest(data)
+        violations = self.cache.get(file_path, digest)
+        if violations is None:
+            violations = self.scan_code_standards(content, file_path)
+            self.cache.put(file_path, digest, violations)
         return violations
 
     def detect_tech_stack(self):
@@ -209,67 +392,170 @@ class FullPictureAnalyzer:
         
         # Generate timestamped report filename
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        report_filename = f"context_review_{timestamp}.json"
+        report_filename = f"context_review_{timestamp}.json" + REPORT_COMPRESSIONS.get(self.compression, "")
         reports_output_path = reports_folder / report_filename
         
         total_files = len(self.context.dependency_map)
-        processed = 0
-        
-        for file_path in self.context.dependency_map.keys():
-            abs_path = self.source_folder / file_path
-            try:
-                with open(abs_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                
-                self.report_data["files"].append({
-                    "path": file_path,
-                    "violations": self.analyze_code_standards(content, file_path),
-                    "summary": content[:1000]  # Provide actual code context to AI
-                })
-                processed += 1
-            except Exception as e:
-                print("Warning: Error processing file " + str(file_path) + ": " + str(e), file=sys.stderr)
-                continue
+        review_paths = list(self.context.dependency_map.keys())
+        if self.impact_seeds is not None:
+            scope = set(self.impact(self.impact_seeds))
+            review_paths = [p for p in review_paths if p in scope]
+            print("Impact scope: " + str(len(review_paths)) + " of " + str(total_files) + " files")
 
-        # Generate summary statistics
-        all_violations = []
-        for file_data in self.report_data["files"]:
-            all_violations.extend(file_data["violations"])
-        
-        severity_counts = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0}
-        type_counts = {}
-        
-        for v in all_violations:
-            severity_counts[v["severity"]] = severity_counts.get(v["severity"], 0) + 1
-            v_type = v["type"]
-            type_counts[v_type] = type_counts.get(v_type, 0) + 1
-
-        report = {
-            "context": asdict(self.context),
-            "analysis": {
-                **self.report_data,
-                "summary": {
-                    "total_files_scanned": processed,
-                    "total_violations": len(all_violations),
-                    "severity_breakdown": severity_counts,
-                    "violation_types": type_counts
-                }
-            }
-        }
+        with SpillFile() as scanned:
+            self._write_report(review_paths, scanned, reports_output_path, report_filename)
+
+    def _write_report(self, review_paths: List[str], scanned: SpillFile, reports_output_path: Path,
+                      report_filename: str):
+        """Scan, pack and write the report, parking per-file results in `scanned` between the passes."""
+        # Pass 1: scan file by file. Violations (and, without a token budget, the summary text)
+        # are spilled to disk; only the packing outlines stay in memory.
+        rule_counts = [0] * len(RULE_TABLE)
+        outlines = []
+        processed = context_tokens = 0
+        for file_path, violations, outline, head in self._scan_files(review_paths, rule_counts):
+            scanned.append([file_path, violations, head])
+            processed += 1
+            if outline is not None:
+                outlines.append(outline)
+            else:
+                context_tokens += estimate_tokens(head)
+
+        # Provide actual code context to AI: the most relevant excerpts that fit the token budget
+        plans = None
+        if self.token_budget is not None:
+            plans = ContextPacker(self.token_budget).plan(outlines)
+            context_tokens = sum(plan.tokens for plan in plans)
+        del outlines
+
+        if self.cache is not None:
+            self.cache.save()
+            print(self.cache.summary())
+            print("Import graph " + self.import_cache.summary())
+
+        summary = self._summarize(rule_counts, processed, context_tokens)
+        severity_counts = summary["severity_breakdown"]
+        total_violations = summary["total_violations"]
+        # Pass 2: file records are rendered and written one at a time
+        fields = self._report_fields(self._file_records(scanned, plans), summary)
 
         try:
-            with open(reports_output_path, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2)
+            with open_report(reports_output_path, self.compression) as f:
+                write_json_object(f, fields, indent=None if self.compact else 2)
             
             print("Success: Full Picture Report generated: " + str(reports_output_path))
             print("   Files scanned: " + str(processed))
-            print("   Total issues: " + str(len(all_violations)))
+            print("   Import edges: " + str(self.import_graph.edge_count))
+            if plans is not None:
+                print("   Context: " + str(context_tokens) + " of " + str(self.token_budget) + " tokens, "
+                      + str(sum(1 for p in plans if p.complete)) + " files complete, "
+                      + str(sum(1 for p in plans if p.lines and not p.complete)) + " excerpted")
+            print("   Total issues: " + str(total_violations))
             print("   Critical: " + str(severity_counts['CRITICAL']) + ", High: " + str(severity_counts['HIGH']) + ", Medium: " + str(severity_counts['MEDIUM']) + ", Low: " + str(severity_counts['LOW']))
             print("   Latest report: " + report_filename)
         except Exception as e:
             print("Error: Error writing report: " + str(e), file=sys.stderr)
             sys.exit(1)
 
+        if self.history:
+            with ReviewHistory(self.history) as history:
+                run_id = history.ingest(report_filename, self.report_data["timestamp"],
+                                        self.report_data["project_root"], RULE_TABLE,
+                                        ((path, violations) for path, violations, _ in scanned))
+            print("   History: run " + str(run_id) + " in " + str(self.history))
+
+    def _summarize(self, rule_counts: List[int], processed: int, context_tokens: int) -> Dict[str, Any]:
+        """Report summary: per-rule violation counts broken down by severity and type."""
+        severity_counts = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0}
+        type_counts = {}
+        for rule, count in zip(RULE_TABLE, rule_counts):
+            if count:
+                severity_counts[rule["severity"]] = severity_counts.get(rule["severity"], 0) + count
+                type_counts[rule["type"]] = type_counts.get(rule["type"], 0) + count
+        return {
+            "total_files_scanned": processed,
+            "total_violations": sum(rule_counts),
+            "severity_breakdown": severity_counts,
+            "violation_types": type_counts,
+            "context_tokens": context_tokens,
+            "context_token_budget": self.token_budget
+        }
+
+    def _report_fields(self, records, summary: Dict[str, Any]) -> List[tuple]:
+        """Top-level report fields for write_json_object; `records` (file entries) are streamed."""
+        analysis = [
+            ("timestamp", self.report_data["timestamp"]),
+            ("project_root", self.report_data["project_root"]),
+            ("files", StreamedArray(records)),
+        ]
+        if self.compact:
+            return [("format", COMPACT_FORMAT), ("context", asdict(self.context)),
+                    ("analysis", StreamedObject(analysis + [("rules", RULE_TABLE), ("summary", summary)]))]
+        return [("context", asdict(self.context)), ("analysis", StreamedObject(analysis + [("summary", summary)]))]
+
+    def _scan_files(self, paths: List[str], rule_counts: List[int]):
+        """Yield (path, violations, outline, head) per readable file, adding each violation to rule_counts.
+
+        With a token budget the outline feeds the packer and head is None;
+        without one there is no outline and head is the file's summary.
+        """
+        centrality = self.import_graph.centrality()
+        read = lambda file_path: (self.source_folder / file_path).read_bytes()
+        for file_path, pending in prefetch(paths, read, self.read_ahead):
+            try:
+                data = pending.result()
+                content = decode_text(data)
+                violations = self._cached_violations(data, content, file_path)
+                if self.token_budget is None:
+                    outline, head = None, content[:self.SUMMARY_CHARS]
+                else:
+                    outline, head = self._outline(file_path, content, violations, centrality), None
+            except Exception as e:
+                print("Warning: Error processing file " + str(file_path) + ": " + str(e), file=sys.stderr)
+                continue
+            for rule_id, _ in violations:
+                rule_counts[rule_id] += 1
+            yield file_path, violations, outline, head
+
+    def _outline(self, file_path: str, content: str, violations: List[List[int]], centrality: List[float]):
+        """Content-free packing shape of one file."""
+        return ContextPacker.outline(PackCandidate(
+            path=file_path,
+            content=content,
+            findings=len(violations),
+            flagged_lines=[line for _, line in violations],
+            high_stakes=Path(file_path).name in self.HIGH_STAKES_COMPONENTS,
+            centrality=centrality[self.import_graph.ids[file_path]],
+        ))
+
+    def _file_records(self, scanned, plans):
+        """Report entries in scan order; files with an excerpt in the plan are read again to render it."""
+        if plans is None:
+            for file_path, violations, head in scanned:
+                yield self._file_record(file_path, violations, head)
+            return
+
+        def read(entry):
+            (file_path, _, _), plan = entry
+            if plan.complete or plan.lines:
+                return (self.source_folder / file_path).read_bytes()
+            return None
+
+        for ((file_path, violations, _), plan), pending in prefetch(zip(scanned, plans), read, self.read_ahead):
+            summary = ""
+            if plan.complete or plan.lines:
+                try:
+                    summary = ContextPacker.excerpt(decode_text(pending.result()), plan)
+                except OSError as e:
+                    print("Warning: Error re-reading file " + str(file_path) + ": " + str(e), file=sys.stderr)
+            yield self._file_record(file_path, violations, summary)
+
+    def _file_record(self, file_path: str, violations: List[List[int]], summary: str) -> Dict[str, Any]:
+        return {
+            "path": file_path,
+            "violations": violations if self.compact else expand_violations(violations, RULE_TABLE),
+            "summary": summary
+        }
 
 if __name__ == "__main__":
     import argparse
@@ -278,8 +564,122 @@ if __name__ == "__main__":
     parser.add_argument('--path', default='.', help='Source folder path (default: current directory)')
     parser.add_argument('--output', default='context_review.json', help='Base output filename (saved in reports folder with timestamp)')
     parser.add_argument('--name', default='Project', help='Project name')
+    parser.add_argument('--cache', action='store_true', help='Reuse results for unchanged files between runs')
+    parser.add_argument('--cache-dir', help=f'Cache location (default: <path>/{CACHE_DIR_NAME})')
+    parser.add_argument('--gitignore', action='store_true', help='Also skip files matched by .gitignore')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Worker processes for import parsing (0 = one per CPU)')
+    parser.add_argument('--read-ahead', type=int, default=DEFAULT_READ_AHEAD,
+                        help='Files read concurrently ahead of the scan, for slow or network filesystems (1 = serial)')
+    parser.add_argument('--token-budget', type=int,
+                        help='Pack the most relevant source excerpts into about this many tokens '
+                             f'(default: the first {FullPictureAnalyzer.SUMMARY_CHARS} characters of every file)')
+    parser.add_argument('--format', choices=['compact', 'verbose'], default='verbose',
+                        help='verbose: one dict per violation (default); compact: shared rule table and '
+                             '[rule_id, line] violations, for consumers that read it via load_report or "expand"')
+    parser.add_argument('--compress', choices=sorted(REPORT_COMPRESSIONS), help='Compress the report file')
+    parser.add_argument('--history', metavar='DB',
+                        help='Record this run in a SQLite history store, e.g. '
+                             f'{FullPictureAnalyzer.DEFAULT_HISTORY} (the history commands\' default)')
+    parser.add_argument('--impact-of', nargs='+', metavar='FILE',
+                        help='Review only these files and everything that transitively imports them')
+    
+    commands = parser.add_subparsers(dest='command')
+    impact_parser = commands.add_parser('impact', help='List the files transitively connected to FILE(s) by imports')
+    impact_parser.add_argument('files', nargs='+', metavar='FILE', help='Paths relative to --path (or absolute)')
+    impact_parser.add_argument('--direction', choices=['dependents', 'dependencies', 'both'], default='dependents',
+                               help='dependents: files affected by a change (default); dependencies: files relied on')
+    impact_parser.add_argument('--depth', type=int, help='Follow at most this many import hops')
+    impact_parser.add_argument('--json', action='store_true', help='Print a JSON object instead of one path per line')
+    expand_parser = commands.add_parser('expand', help='Print any report in the verbose format for older consumers')
+    expand_parser.add_argument('report', help='Report file (compact or verbose, optionally gzip/zstd compressed)')
+    history_parser = commands.add_parser('history', help='Query the report history store (see --history)')
+    history_commands = history_parser.add_subparsers(dest='history_command', required=True)
+    ingest_parser = history_commands.add_parser('ingest', help='Add existing report files to the history')
+    ingest_parser.add_argument('reports', nargs='+', metavar='REPORT')
+    history_commands.add_parser('runs', help='List recorded runs')
+    diff_parser = history_commands.add_parser('diff', help='New and fixed violations between two runs')
+    diff_parser.add_argument('base', nargs='?', type=int, help='Run id to compare against (default: the run before HEAD)')
+    diff_parser.add_argument('head', nargs='?', type=int, help='Run id to compare (default: the latest run)')
+    diff_parser.add_argument('--json', action='store_true', help='Print a JSON object')
+    trend_parser = history_commands.add_parser('trend', help='Violation counts per rule across runs')
+    trend_parser.add_argument('--type', help='Only rules of this violation type (e.g. ACCESSIBILITY)')
+    trend_parser.add_argument('--json', action='store_true', help='Print a JSON array')
     
     args = parser.parse_args()
     
-    analyzer = FullPictureAnalyzer(args.path, args.name)
-    analyzer.generate_report(args.output)
+    if args.command == 'expand':
+        try:
+            report = load_report(args.report)
+        except (OSError, ValueError, RuntimeError) as e:
+            parser.error(str(e))
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+
+    if args.command == 'history':
+        with ReviewHistory(args.history or FullPictureAnalyzer.DEFAULT_HISTORY) as history:
+            if args.history_command == 'ingest':
+                for report_path in args.reports:
+                    try:
+                        run_id = ingest_report(history, Path(report_path).name, load_report(report_path))
+                    except (OSError, ValueError, KeyError, RuntimeError) as e:
+                        print("Warning: Skipping " + report_path + ": " + str(e), file=sys.stderr)
+                        continue
+                    print("run " + str(run_id) + ": " + report_path)
+            elif args.history_command == 'runs':
+                for run in history.runs():
+                    print(str(run["id"]).rjust(5) + "  " + run["timestamp"] + "  " + str(run["files_scanned"]).rjust(5)
+                          + " files  " + str(run["violations"]).rjust(6) + " violations  " + run["report"])
+            elif args.history_command == 'diff':
+                head = args.head if args.head is not None else history.latest_run()
+                base = args.base if args.base is not None else (history.latest_run(before=head) if head else None)
+                if head is None or base is None:
+                    parser.error("the history needs at least two runs to diff")
+                try:
+                    changes = history.diff(base, head)
+                except ValueError as e:
+                    parser.error(str(e))
+                if args.json:
+                    print(json.dumps({"base": base, "head": head, **changes}, indent=2))
+                else:
+                    print("Run " + str(base) + " -> " + str(head) + ": " + str(sum(c["count"] for c in changes["new"]))
+                          + " new, " + str(sum(c["count"] for c in changes["fixed"])) + " fixed")
+                    for label, entries in (("+", changes["new"]), ("-", changes["fixed"])):
+                        for c in entries:
+                            lines = (" (lines " + ", ".join(map(str, c["lines"])) + ")") if c["lines"] else ""
+                            print(label + " " + c["path"] + ": [" + c["severity"] + "] " + c["type"] + " x"
+                                  + str(c["count"]) + lines)
+            else:
+                rows = history.trend(args.type)
+                if args.json:
+                    print(json.dumps(rows, indent=2))
+                else:
+                    for row in rows:
+                        print(str(row["run"]).rjust(5) + "  " + row["timestamp"] + "  " + str(row["count"]).rjust(6)
+                              + "  [" + row["severity"] + "] " + row["type"] + ": " + row["message"])
+        sys.exit(0)
+
+    analyzer = FullPictureAnalyzer(args.path, args.name, use_cache=args.cache, cache_dir=args.cache_dir,
+                                   use_gitignore=args.gitignore, jobs=args.jobs, token_budget=args.token_budget,
+                                   compact=args.format == 'compact', compression=args.compress,
+                                   history=args.history, read_ahead=args.read_ahead)
+    if args.command == 'impact':
+        analyzer.scan_project_structure()
+        started = time.perf_counter()
+        try:
+            files = analyzer.impact(args.files, direction=args.direction, max_depth=args.depth)
+        except ValueError as e:
+            parser.error(str(e))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if args.json:
+            print(json.dumps({"files": files, "seeds": args.files, "direction": args.direction,
+                              "query_ms": round(elapsed_ms, 3)}, indent=2))
+        else:
+            print("\n".join(files))
+            print(f"{len(files)} files ({args.direction}) in {elapsed_ms:.1f} ms", file=sys.stderr)
+    else:
+        if args.impact_of:
+            analyzer.limit_to_impact_of(args.impact_of)
+        try:
+            analyzer.generate_report(args.output)
+        except ValueError as e:
+            parser.error(str(e))
@@ -1,13 +1,75 @@
 #!/usr/bin/env python3
-import os
+import json
 from pathlib import Path
 from datetime import datetime
 import re
 
+from review_common import (
+    ContextPacker, IgnoreRules, PackCandidate, build_import_graph, estimate_tokens, iter_files, walk_project,
+)
+
+class ShardWriter:
+    """Streams one logic group to disk, starting a new shard file before a block would exceed the caps.
+
+    A file's block is never split, so every shard can be loaded on its own; a
+    single block larger than the caps gets a shard to itself.
+    """
+
+    def __init__(self, output_dir, group, max_bytes=None, max_tokens=None):
+        self.output_dir = output_dir
+        self.group = group
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.shards = []  # manifest records: file, group, bytes, tokens, files
+        self._stream = None
+
+    def shard_name(self, number):
+        # The first shard keeps the historical single-file name
+        if number == 1:
+            return f"{self.group}_logic_group.txt"
+        return f"{self.group}_logic_group_part{number}.txt"
+
+    def write(self, block):
+        """Append one block; returns where it landed (shard, byte offset, bytes, tokens)."""
+        data = block.encode('utf-8')
+        tokens = estimate_tokens(block)
+        shard = self.shards[-1] if self.shards else None
+        if shard is None or (shard['files'] and self._overflows(shard, len(data), tokens)):
+            shard = self._next_shard()
+        offset = shard['bytes']
+        self._stream.write(data)
+        shard['bytes'] += len(data)
+        shard['tokens'] += tokens
+        shard['files'] += 1
+        return {'shard': shard['file'], 'offset': offset, 'bytes': len(data), 'tokens': tokens}
+
+    def _overflows(self, shard, size, tokens):
+        return ((self.max_bytes is not None and shard['bytes'] + size > self.max_bytes) or
+                (self.max_tokens is not None and shard['tokens'] + tokens > self.max_tokens))
+
+    def _next_shard(self):
+        self.close()
+        shard = {'file': self.shard_name(len(self.shards) + 1), 'group': self.group, 'bytes': 0, 'tokens': 0, 'files': 0}
+        self.shards.append(shard)
+        # Binary, so manifest offsets are exact byte positions on every platform
+        self._stream = open(self.output_dir / shard['file'], 'wb')
+        return shard
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
 class ProjectIntelligenceExporter:
-    def __init__(self, source_dir='.', output_dir='ai_logic_review'):
+    def __init__(self, source_dir='.', output_dir='ai_logic_review', use_gitignore=False, token_budget=None,
+                 max_shard_bytes=None, max_shard_tokens=None):
         self.source_dir = Path(source_dir).resolve()
         self.output_dir = Path(output_dir).resolve()
+        # Approximate tokens of file content across all groups (None = export everything in full)
+        self.token_budget = token_budget
+        # Caps per group file; a group that outgrows them continues in <ext>_logic_group_partN.txt (None = no cap)
+        self.max_shard_bytes = max_shard_bytes
+        self.max_shard_tokens = max_shard_tokens
         # Extensions to include for analysis
         self.include_ext = {
             '.gs', '.html', '.js', '.css', '.json', '.csv', 
@@ -19,22 +81,28 @@ class ProjectIntelligenceExporter:
             'backup', 'ai_logic_review', 'plans', 'coverage', '.qodo'
         }
         self.exclude_ext = {'.md', '.txt', '.png', '.jpg', '.pdf', '.jpeg', '.gif', '.svg', '.py'}
+        self.ignore_rules = IgnoreRules(self.source_dir, dir_names=self.exclude_dirs, use_gitignore=use_gitignore)
+
+    def walk(self):
+        """Single traversal shared by the structure tree and the file export."""
+        return walk_project(self.source_dir, self.ignore_rules)
 
-    def generate_tree(self):
+    def generate_tree(self, tree=None):
         """Creates a visual directory tree to give the AI structural context."""
-        tree = ["PROJECT_STRUCTURE:"]
-        for root, dirs, files in os.walk(self.source_dir):
-            dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
-            rel_path = Path(root).relative_to(self.source_dir)
-            level = len(rel_path.parts)
-            indent = "  " * level
-            if str(rel_path) != ".":
-                tree.append(f"{indent}📁 {rel_path.name}/")
-            for f in sorted(files):
-                f_path = Path(f)
-                if f_path.suffix in self.include_ext:
-                    tree.append(f"{indent}  📄 {f}")
-        return "\n".join(tree)
+        lines = ["PROJECT_STRUCTURE:"]
+        self._append_tree(tree or self.walk(), lines, 0)
+        return "\n".join(lines)
+
+    def _append_tree(self, node, lines, level):
+        indent = "  " * level
+        if node.rel_path:
+            lines.append(f"{indent}📁 {node.name}/")
+        for child in sorted((c for c in node.children if not c.is_dir), key=lambda c: c.name):
+            if Path(child.name).suffix in self.include_ext:
+                lines.append(f"{indent}  📄 {child.name}")
+        for child in node.children:
+            if child.is_dir:
+                self._append_tree(child, lines, level + 1)
 
     def extract_csv_schema(self, file_path):
         """Extracts headers from CSVs to provide 'database' context to the AI."""
@@ -51,77 +119,140 @@ class ProjectIntelligenceExporter:
         gs_calls = re.findall(r'google\.script\.run\.(?:with\w+Handler\(.*?\)\.)?(\w+)\(', content)
         return list(set(gs_calls))
 
+    def read_source(self, f_path):
+        # utf-8, ignoring errors for binary or corrupt files
+        with open(f_path, 'r', encoding='utf-8', errors='ignore') as src:
+            return src.read()
+
+    def plan_contents(self, paths):
+        """Which parts of each file fit the token budget, favouring files many others import.
+
+        Files are outlined one at a time, so only the plans stay in memory; the
+        excerpts are cut when the files are read again for export.
+        """
+        rel_paths = [f_path.relative_to(self.source_dir).as_posix() for f_path in paths]
+        centrality = build_import_graph(self.source_dir, rel_paths).centrality()
+        outlines = []
+        for index, f_path in enumerate(paths):
+            try:
+                content = self.read_source(f_path)
+            except Exception:
+                continue  # reported when the file is exported
+            outlines.append(ContextPacker.outline(
+                PackCandidate(path=rel_paths[index], content=content, centrality=centrality[index])
+            ))
+        return {plan.path: plan for plan in ContextPacker(self.token_budget).plan(outlines)}
+
     def process(self):
-        # Create output folder if it doesn't exist
+        # Create output folder if it doesn't exist; drop extra shards left over from a larger earlier export
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.output_dir.glob('*_logic_group_part*.txt'):
+            stale.unlink()
         
-        # 1. Generate Master Context
+        # 1. Generate Master Context (one walk feeds the tree and the file list)
+        tree = self.walk()
         master_context = [
             f"PROJECT_ANALYSIS_DATE: {datetime.now()}",
-            self.generate_tree(),
+            self.generate_tree(tree),
             "\n" + "="*80 + "\n"
         ]
 
-        # Group data storage
+        all_files = sorted(
+            node.path for node in iter_files(tree)
+            if node.path.suffix in self.include_ext and node.path.suffix not in self.exclude_ext
+        )
+        plans = self.plan_contents(all_files) if self.token_budget is not None else {}
+
+        # Each file is written to its group's current shard as soon as it is read
         groups = {}
-        all_files = []
-        
-        for root, dirs, files in os.walk(self.source_dir):
-            dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
-            for f in files:
-                f_path = Path(root) / f
-                if f_path.suffix in self.include_ext and f_path.suffix not in self.exclude_ext:
-                    all_files.append(f_path)
-
-        for f_path in sorted(all_files):
-            rel_path = f_path.relative_to(self.source_dir)
-            ext = f_path.suffix.lower().replace('.', '')
-            
-            try:
-                # Read source with utf-8, ignoring errors for binary or corrupt files
-                with open(f_path, 'r', encoding='utf-8', errors='ignore') as src:
-                    content = src.read()
-
-                # Build AI Metadata Block for context grounding
-                meta_block = [
-                    f"\n{'='*80}",
-                    f"FILE_BEGIN: {rel_path}",
-                    f"TYPE: {ext.upper()}",
-                    f"SIZE: {f_path.stat().st_size} bytes"
-                ]
-
-                # Context-specific logic
-                if ext == 'csv':
-                    meta_block.append(self.extract_csv_schema(f_path))
-                
-                refs = self.find_references(content)
-                if refs:
-                    meta_block.append(f"OUTBOUND_REFERENCES (API Calls): {', '.join(refs)}")
-
-                meta_block.append("="*80 + "\n")
-
-                # Grouping logic
-                group_key = f"{ext}_logic_group.txt"
-                if group_key not in groups:
-                    groups[group_key] = []
-                
-                groups[group_key].append("\n".join(meta_block) + content + f"\n\n[FILE_END: {rel_path}]\n{'#'*80}\n")
-                print(f"✅ Analyzed: {rel_path}")
-
-            except Exception as e:
-                print(f"❌ Error processing {rel_path}: {e}")
-
-        # Write Grouped Files (forcing utf-8 to handle markers and special characters)
-        for filename, blocks in groups.items():
-            with open(self.output_dir / filename, 'w', encoding='utf-8') as f:
-                f.write("".join(blocks))
+        manifest_files = []
+        try:
+            for f_path in all_files:
+                rel_path = f_path.relative_to(self.source_dir)
+                ext = f_path.suffix.lower().replace('.', '')
+                try:
+                    content = self.read_source(f_path)
+                except Exception as e:
+                    print(f"❌ Error processing {rel_path}: {e}")
+                    continue
+
+                try:
+                    # Build AI Metadata Block for context grounding
+                    meta_block = [
+                        f"\n{'='*80}",
+                        f"FILE_BEGIN: {rel_path}",
+                        f"TYPE: {ext.upper()}",
+                        f"SIZE: {f_path.stat().st_size} bytes"
+                    ]
+
+                    # Context-specific logic
+                    if ext == 'csv':
+                        meta_block.append(self.extract_csv_schema(f_path))
+                    
+                    refs = self.find_references(content)
+                    if refs:
+                        meta_block.append(f"OUTBOUND_REFERENCES (API Calls): {', '.join(refs)}")
+
+                    plan = plans.get(rel_path.as_posix())
+                    if plan is not None:
+                        content = ContextPacker.excerpt(content, plan)
+                        if not content:
+                            meta_block.append("CONTENT: omitted (token budget)")
+                        elif not plan.complete:
+                            meta_block.append(f"CONTENT: excerpt (relevance rank {plan.rank}; signatures and exports)")
+
+                    meta_block.append("="*80 + "\n")
+
+                    # Grouping logic
+                    if ext not in groups:
+                        groups[ext] = ShardWriter(self.output_dir, ext, self.max_shard_bytes, self.max_shard_tokens)
+                    
+                    placement = groups[ext].write(
+                        "\n".join(meta_block) + content + f"\n\n[FILE_END: {rel_path}]\n{'#'*80}\n"
+                    )
+                    manifest_files.append({'path': rel_path.as_posix(), 'group': ext, **placement})
+                    print(f"✅ Analyzed: {rel_path}")
+
+                except Exception as e:
+                    print(f"❌ Error processing {rel_path}: {e}")
+        finally:
+            for writer in groups.values():
+                writer.close()
 
         # Write Final Master Context (THIS FIXES THE UNICODEENCODEERROR)
         with open(self.output_dir / "00_master_context.txt", "w", encoding='utf-8') as f:
             f.write("\n".join(master_context))
 
+        # Manifest: which shard (and byte range within it) holds each file
+        manifest = {
+            'generated': datetime.now().isoformat(),
+            'source': str(self.source_dir),
+            'max_shard_bytes': self.max_shard_bytes,
+            'max_shard_tokens': self.max_shard_tokens,
+            'shards': [shard for writer in groups.values() for shard in writer.shards],
+            'files': manifest_files,
+        }
+        with open(self.output_dir / "00_manifest.json", "w", encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
         print(f"\n🚀 Success! AI-optimized analysis files are in: '{self.output_dir}'")
 
 if __name__ == "__main__":
-    exporter = ProjectIntelligenceExporter()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Export project files as grouped AI context')
+    parser.add_argument('source', nargs='?', default='.', help='Project folder to export')
+    parser.add_argument('--output', default='ai_logic_review', help='Output folder')
+    parser.add_argument('--gitignore', action='store_true', help='Also skip files matched by .gitignore')
+    parser.add_argument('--token-budget', type=int,
+                        help='Pack file contents into about this many tokens instead of exporting them in full')
+    parser.add_argument('--max-shard-bytes', type=int,
+                        help='Split each group file into shards of at most this many bytes (files are never split)')
+    parser.add_argument('--max-shard-tokens', type=int,
+                        help='Split each group file into shards of at most about this many tokens')
+    args = parser.parse_args()
+
+    exporter = ProjectIntelligenceExporter(args.source, args.output, use_gitignore=args.gitignore,
+                                           token_budget=args.token_budget, max_shard_bytes=args.max_shard_bytes,
+                                           max_shard_tokens=args.max_shard_tokens)
     exporter.process()
\ No newline at end of file
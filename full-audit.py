@@ -7,13 +7,21 @@ Tailored for the "Properties 4 Creation" Community Developer Pivot (40/30/20/10
 """
 
 import os
-import sys
 import re
+import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
-from dataclasses import dataclass, field
-from collections import defaultdict
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+from dataclasses import dataclass, field, asdict
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from review_common import (
+    CACHE_DIR_NAME, DEFAULT_READ_AHEAD, GENERATED_POLICIES, LARGE_FILE_BYTES, AnalysisCache, Buffer, ByteLines,
+    ContextPacker, FileOutline, IgnoreRules, IssueTally, LexedSource, LineIndex, PackCandidate, PackPlan, ProgressLine,
+    SourceFile, TreeNode, build_import_graph, compile_rules, generated_reason, iter_files, iter_line_spans,
+    lexed_lines_of_code, load_source, prefetch, rules_fingerprint, walk_project,
+)
 
 # =============================================================================
 # CONFIGURATION & STANDARDS
@@ -30,9 +38,13 @@ class Issue:
 class FileData:
     path: str
     extension: str
-    content: str
     loc: int
     issues: List[Issue] = field(default_factory=list)
+    # Text for the report when it is not the file on disk (generated-file samples);
+    # otherwise the source is streamed from disk while the report is written
+    content: Optional[str] = None
+    # Content-free packing shape, recorded during the scan when a token budget is set
+    outline: Optional[FileOutline] = None
 
 class P4CStandards:
     # UPDATED MISSION: The 40/30/20/10 Community Developer Split
@@ -60,20 +72,70 @@ class P4CStandards:
         (r'(?i)gold standard', 'MEDIUM', 'Brand-Misalignment', 'Replace "Gold Standard" with "Reliability Pledge"')
     ]
 
+# =============================================================================
+# REPORT OUTPUT
+# =============================================================================
+
+# Write buffer of the report file; large sequential writes instead of one per line
+REPORT_BUFFER_BYTES = 1 << 20
+
+
+class ReportWriter:
+    """Writes report pieces separated by newlines, exactly like `"\\n".join(pieces)`, as they come."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.started = False
+
+    def append(self, text: str):
+        self._separate()
+        self.stream.write(text)
+
+    def append_pieces(self, pieces: Iterable[str]):
+        """Write several strings as one piece, without joining them first."""
+        self._separate()
+        for piece in pieces:
+            self.stream.write(piece)
+
+    def append_stream(self, source: TextIO):
+        """Copy a text stream as one piece, chunk by chunk."""
+        self._separate()
+        shutil.copyfileobj(source, self.stream, REPORT_BUFFER_BYTES)
+
+    def _separate(self):
+        if self.started:
+            self.stream.write('\n')
+        self.started = True
+
 # =============================================================================
 # ENGINE CORE
 # =============================================================================
 
 class P4CIntelligenceEngine:
-    def __init__(self, source_dir: str = '.'):
+    def __init__(self, source_dir: str = '.', use_cache: bool = False, cache_dir: Optional[str] = None,
+                 use_gitignore: bool = False, token_budget: Optional[int] = None,
+                 read_ahead: int = DEFAULT_READ_AHEAD, generated_files: str = 'bytes',
+                 tree_max_depth: Optional[int] = None, tree_max_entries: Optional[int] = None, jobs: int = 1):
         self.source_dir = Path(source_dir).resolve()
+        # Worker processes for file analysis (1 = analyze on the main process)
+        self.jobs = jobs or os.cpu_count() or 1
+        # Caps on the Project Structure section (None = unlimited): directory levels shown, entries per directory
+        self.tree_max_depth = tree_max_depth
+        self.tree_max_entries = tree_max_entries
+        # Files read concurrently ahead of the analysis (1 = read serially)
+        self.read_ahead = read_ahead
+        # Large/generated artifacts (bundle stats, Lighthouse reports): 'skip', 'bytes' or 'full'
+        self.generated_files = generated_files
         self.output_file = self.source_dir / "P4C_PROJECT_INTELLIGENCE.md"
+        # Approximate tokens of source code in the report (None = every file in full)
+        self.token_budget = token_budget
         
         # 1. EXCLUDED DIRECTORIES
         self.ignored_dirs = {
             'node_modules', '.git', 'dist', 'build', 'coverage', 
             '__pycache__', '.qodo', 'ai_logic_review', '.vscode', '.idea',
-            'server' # Ignoring server/backend code to focus on Frontend/Content
+            'server', # Ignoring server/backend code to focus on Frontend/Content
+            CACHE_DIR_NAME
         }
         
         # 2. EXCLUDED EXTENSIONS (Explicitly banning non-code assets)
@@ -97,7 +159,13 @@ class P4CIntelligenceEngine:
             'tailwind.config.js', 'postcss.config.js'
         }
         
+        # One walk serves both the file scan and the structure tree
+        self.ignore_rules = IgnoreRules(self.source_dir, dir_names=self.ignored_dirs, use_gitignore=use_gitignore)
+        self._tree: Optional[TreeNode] = None
+        
         self.files_data: List[FileData] = []
+        # Issue counts, updated as files are recorded so scoring never re-walks the issues
+        self.tally = IssueTally()
         self.project_stats = {
             "score": 100,
             "total_files": 0,
@@ -105,12 +173,24 @@ class P4CIntelligenceEngine:
             "issues_breakdown": defaultdict(int)
         }
 
+        # 5. INCREMENTAL CACHE (LOC + issues of unchanged files)
+        self.cache: Optional[AnalysisCache] = None
+        if use_cache:
+            cache_root = Path(cache_dir) if cache_dir else self.source_dir / CACHE_DIR_NAME
+            self.cache = AnalysisCache(
+                cache_root / 'full-audit.json',
+                rules_fingerprint(Path(__file__).read_bytes(), P4CStandards.PATTERNS)
+            )
+
+    def __getstate__(self):
+        # Worker processes only analyze single files: don't ship the cache or the walked tree to them
+        state = self.__dict__.copy()
+        state['cache'] = None
+        state['_tree'] = None
+        return state
+
     def _should_process(self, file_path: Path) -> bool:
-        """Determines if a file should be analyzed based on rules."""
-        # Check Directory
-        if any(part in self.ignored_dirs for part in file_path.parts):
-            return False
-            
+        """Determines if a file should be analyzed based on rules (ignored dirs are pruned by the walk)."""
         # Check Specific Filename
         if file_path.name in self.ignored_filenames:
             return False
@@ -118,115 +198,309 @@ class P4CIntelligenceEngine:
         # Check Extension (Allowlist)
         return file_path.suffix.lower() in self.include_exts
 
-    def _analyze_content(self, content: str, file_name: str) -> List[Issue]:
+    def _analyze_content(self, content: str, file_name: str, lexed: Optional[LexedSource] = None) -> List[Issue]:
         issues = []
+        line_index = LineIndex(content)
+        code = lexed.code if lexed else content
         
-        # Regex Checks
+        # Regex Checks (comments are blanked in `code`, offsets match `content`)
         for pattern, severity, category, msg in P4CStandards.PATTERNS:
-            for match in re.finditer(pattern, content):
-                line_idx = content[:match.start()].count('\n')
+            for match in re.finditer(pattern, code):
                 issues.append(Issue(
                     severity=severity,
                     category=category,
                     message=msg,
-                    line=line_idx + 1
+                    line=line_index.line_number(match.start())
                 ))
         return issues
 
-    def _generate_tree(self, dir_path: Path, prefix: str = "") -> str:
-        """Generates a visual directory tree structure."""
-        output = ""
-        
-        try:
-            # Get all items in directory
-            items = list(dir_path.iterdir())
-            
-            # Filter ignored items
-            filtered_items = []
-            for item in items:
-                # Skip if in ignored dirs
-                if item.is_dir() and item.name in self.ignored_dirs:
-                    continue
-                # Skip if in ignored filenames
-                if item.name in self.ignored_filenames:
-                    continue
-                # Skip hidden files
-                if item.name.startswith('.'):
-                    continue
-                filtered_items.append(item)
-            
-            # Sort: Directories first, then alphabetical
-            filtered_items.sort(key=lambda x: (not x.is_dir(), x.name.lower()))
-            
-            # Build tree string
-            for i, item in enumerate(filtered_items):
-                is_last = (i == len(filtered_items) - 1)
-                connector = "└── " if is_last else "├── "
-                
-                output += f"{prefix}{connector}{item.name}\n"
-                
-                if item.is_dir():
-                    extension = "    " if is_last else "│   "
-                    output += self._generate_tree(item, prefix + extension)
-                    
-        except PermissionError:
-            output += f"{prefix}└── [Access Denied]\n"
-            
-        return output
+    def _project_tree(self) -> TreeNode:
+        if self._tree is None:
+            self._tree = walk_project(self.source_dir, self.ignore_rules)
+        return self._tree
+
+    def _generate_tree(self, node: Optional[TreeNode] = None, prefix: str = "") -> str:
+        """Generates a visual directory tree structure from the cached project walk."""
+        return "".join(self.iter_tree_lines(node, prefix))
+
+    def iter_tree_lines(self, node: Optional[TreeNode] = None, prefix: str = "") -> Iterator[str]:
+        """Yield the tree rendering line by line (each ending in a newline), honouring the depth/entry caps.
+
+        Iterative, so output size and depth cost nothing beyond the lines
+        themselves; entry types come from the walk's cached DirEntry data.
+        """
+        if node is None:
+            node = self._project_tree()
+        levels = [self._tree_level(node, prefix)]
+        while levels:
+            entry = next(levels[-1], None)
+            if entry is None:
+                levels.pop()
+                continue
+            line, child, child_prefix = entry
+            yield line
+            if child is None:
+                continue
+            if self.tree_max_depth is not None and len(levels) >= self.tree_max_depth:
+                hidden = len(self._visible_children(child))
+                if hidden:
+                    yield f"{child_prefix}└── ... {hidden} entries below the depth limit\n"
+            else:
+                levels.append(self._tree_level(child, child_prefix))
+
+    def _visible_children(self, node: TreeNode) -> List[TreeNode]:
+        # Ignored dirs were pruned during the walk; children are already sorted
+        # directories first, then alphabetically
+        return [
+            item for item in node.children
+            if item.name not in self.ignored_filenames and not item.name.startswith('.')
+        ]
+
+    def _tree_level(self, node: TreeNode, prefix: str) -> Iterator[Tuple[str, Optional[TreeNode], str]]:
+        """(line, directory to expand or None, prefix for its children) for each entry of one directory."""
+        if node.access_denied:
+            yield f"{prefix}└── [Access Denied]\n", None, ""
+            return
+
+        items = self._visible_children(node)
+        hidden = 0
+        if self.tree_max_entries is not None and len(items) > self.tree_max_entries:
+            hidden = len(items) - self.tree_max_entries
+            items = items[:self.tree_max_entries]
+        for i, item in enumerate(items):
+            is_last = i == len(items) - 1 and not hidden
+            connector = "└── " if is_last else "├── "
+            extension = "    " if is_last else "│   "
+            yield f"{prefix}{connector}{item.name}\n", item if item.is_dir else None, prefix + extension
+        if hidden:
+            yield f"{prefix}└── ... {hidden} more entries\n", None, ""
 
     def scan_project(self):
         print(f"🚀 Scanning Properties 4 Creation Project at: {self.source_dir}")
         print(f"ℹ️  Mission: {P4CStandards.MISSION}")
         
-        for root, dirs, files in os.walk(self.source_dir):
-            # Filter directories in-place
-            dirs[:] = [d for d in dirs if d not in self.ignored_dirs]
-            
-            for file in sorted(files):
-                file_path = Path(root) / file
-                if not self._should_process(file_path):
-                    continue
-
+        self._tree = walk_project(self.source_dir, self.ignore_rules)
+        nodes = [node for node in iter_files(self._tree) if self._should_process(node.path)]
+        progress = ProgressLine("  🔍 Processed files:", len(nodes))
+        pool = None
+        if self.jobs > 1 and len(nodes) > 1:
+            pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=(self,))
+        try:
+            for node, digest, pending in self._stage_files(nodes, pool, progress):
                 try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-
-                    # Calculate LOC
-                    lines = content.split('\n')
-                    loc = len([l for l in lines if l.strip() and not l.strip().startswith(('#', '//', '/*'))])
-
-                    rel_path = str(file_path.relative_to(self.source_dir))
-                    issues = self._analyze_content(content, rel_path)
-                    
-                    self.files_data.append(FileData(
-                        path=rel_path,
-                        extension=file_path.suffix,
-                        content=content,
-                        loc=loc,
-                        issues=issues
-                    ))
-                    print(f"  ✅ Analyzed: {rel_path}")
-
+                    file_data = pending.result()
                 except Exception as e:
-                    print(f"  ❌ Failed to read {file}: {e}")
+                    progress.message(f"  ❌ Failed to read {node.name}: {e}")
+                else:
+                    if file_data is not None:
+                        if digest is not None:
+                            self.cache.put(file_data.path, digest, {
+                                'loc': file_data.loc, 'issues': [asdict(i) for i in file_data.issues]
+                            })
+                        self.record(file_data)
+                progress.advance()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        progress.close()
+
+        if self.cache is not None:
+            self.cache.save()
+            print(f"💾 {self.cache.summary()}")
+
+    def _stage_files(self, nodes: List[TreeNode], pool: Optional[ProcessPoolExecutor],
+                     progress: ProgressLine) -> Iterator[Tuple[TreeNode, Optional[str], Future]]:
+        """(node, cache digest to store, future FileData or None when skipped) per file, in walk order.
+
+        Reads run read_ahead files ahead on threads. With a worker pool up to
+        jobs * 4 files are analyzed concurrently; results still come back in
+        path order, so the report does not depend on scheduling.
+        """
+        in_flight: Deque[Tuple[TreeNode, Optional[str], Future]] = deque()
+        window = self.jobs * 4 if pool is not None else 0
+        for node, loaded in prefetch(nodes, lambda node: self._load(node.path), self.read_ahead):
+            in_flight.append(self._start_analysis(node, loaded, pool, progress))
+            while len(in_flight) > window:
+                yield in_flight.popleft()
+        while in_flight:
+            yield in_flight.popleft()
+
+    def _start_analysis(self, node: TreeNode, loaded: Future, pool: Optional[ProcessPoolExecutor],
+                        progress: ProgressLine) -> Tuple[TreeNode, Optional[str], Future]:
+        """Apply the generated-file policy and the cache to one loaded file, then analyze it here or on the pool."""
+        result = Future()
+        digest = source = None
+        try:
+            source = loaded.result()
+            rel_path = str(node.path.relative_to(self.source_dir))
+            reason = generated_reason(source) if self.generated_files != 'full' else None
+            if reason and self.generated_files == 'skip':
+                progress.message(f"  ⏭️  Skipped generated file: {rel_path} ({reason})")
+                result.set_result(None)
+                return node, None, result
+
+            if self.cache is not None and not reason:
+                digest = self.cache.digest(source.data)
+                cached = self.cache.get(rel_path, digest)
+                if cached is not None:
+                    issues = [Issue(**i) for i in cached['issues']]
+                    # The text is only needed for the packing outline; don't decode it otherwise
+                    text = source.text if self.token_budget is not None else None
+                    result.set_result(self._file_data(rel_path, cached['loc'], issues, text))
+                    return node, None, result
+
+            if pool is not None:
+                # Mapped files cannot be pickled; the worker maps them again itself
+                shipped = source if isinstance(source, SourceFile) else None
+                return node, digest, pool.submit(_analyze_in_worker, rel_path, shipped, reason)
+            result.set_result(self._analyze_file(rel_path, source, reason))
+        except Exception as e:
+            result.set_exception(e)
+        finally:
+            # Nothing keeps the buffer: samples and snippets are decoded copies, and workers map files themselves
+            if source is not None:
+                source.close()
+        return node, digest, result
+
+    def _load(self, file_path: Path):
+        """Load a file, mapping it instead when it is too large to be source (unless generated_files='full')."""
+        return load_source(file_path, LARGE_FILE_BYTES if self.generated_files != 'full' else float('inf'))
+
+    def _analyze_file(self, rel_path: str, source, reason: Optional[str]) -> FileData:
+        """LOC, issues and packing outline of one file; runs on a worker process in --jobs mode."""
+        owned = source is None
+        if source is None:
+            source = self._load(self.source_dir / rel_path)
+        try:
+            if reason:
+                loc, issues, sample = self._analyze_generated(source, reason)
+                return self._file_data(rel_path, loc, issues, sample, sample)
+            loc, issues = self._analyze_source(source.text, rel_path)
+            return self._file_data(rel_path, loc, issues, source.text)
+        finally:
+            if owned:
+                source.close()
+
+    def _file_data(self, rel_path: str, loc: int, issues: List[Issue], text: Optional[str],
+                   sample: Optional[str] = None) -> FileData:
+        """Per-file record; `text` feeds the packing outline and may be None without a token budget."""
+        return FileData(
+            path=rel_path,
+            extension=Path(rel_path).suffix,
+            loc=loc,
+            issues=issues,
+            content=sample,
+            outline=self._outline(rel_path, text, issues)
+        )
+
+    # Lines of a generated file shown in the report instead of its full content
+    GENERATED_SAMPLE_LINES = 40
+    GENERATED_SAMPLE_BYTES = 4096
+
+    def _analyze_generated(self, source, reason: str):
+        """LOC, issues and a short sample of a generated file, scanned as raw (possibly mapped) bytes."""
+        lines = ByteLines(source.data)
+        issues = [
+            Issue(severity=severity, category=category, message=msg, line=lines.line_number(start))
+            for (_, severity, category, msg), start
+            in compile_rules(tuple(P4CStandards.PATTERNS), 0, True).iter_matches(source.data)
+        ]
+        sample = lines.head(self.GENERATED_SAMPLE_LINES, self.GENERATED_SAMPLE_BYTES)
+        sample += (f"\n... [generated file, {reason}: {len(lines)} lines / {source.size} bytes, "
+                   f"only the beginning is shown]")
+        loc = lexed_lines_of_code(source.path, source.data)
+        if loc is None:
+            loc = self._count_loc(source.data)
+        return loc, issues, sample
+
+    def _count_loc(self, content: Union[str, Buffer], lexed: Optional[LexedSource] = None) -> int:
+        """LOC from the lexer when available, else non-blank lines that don't open with a comment marker.
+
+        `content` is the text, or the raw bytes of a generated (possibly mapped) file, scanned in place.
+        """
+        if lexed is not None:
+            return lexed.lines_of_code
+        hash_comment, comments = ('#', ('//', '/*')) if isinstance(content, str) else (b'#', (b'//', b'/*'))
+        return sum(1 for start, end in iter_line_spans(content)
+                   if start < end and content[start:start + 1] != hash_comment
+                   and content[start:start + 2] not in comments)
+
+    def _analyze_source(self, content: str, rel_path: str):
+        """LOC and issues from a single lexer pass (HTML falls back to the plain-text heuristics)."""
+        lexed = LexedSource.for_path(rel_path, content)
+        return self._count_loc(content, lexed), self._analyze_content(content, rel_path, lexed)
+
+    def record(self, file_data: FileData):
+        """Add one analyzed file to the results and the running tally."""
+        # Only metadata and issues are kept; the content is read again when the report is written
+        self.files_data.append(file_data)
+        self.tally.add(file_data.path, file_data.issues, file_data.loc)
 
     def calculate_metrics(self):
-        for f in self.files_data:
-            self.project_stats["total_files"] += 1
-            self.project_stats["total_loc"] += f.loc
-            
-            for i in f.issues:
-                self.project_stats["issues_breakdown"][i.severity] += 1
-                if i.severity == "CRITICAL": self.project_stats["score"] -= 15
-                elif i.severity == "HIGH": self.project_stats["score"] -= 10
-                elif i.severity == "MEDIUM": self.project_stats["score"] -= 5
-        
-        self.project_stats["score"] = max(0, self.project_stats["score"])
+        by_severity = self.tally.by_severity
+        self.project_stats["total_files"] = self.tally.file_count
+        self.project_stats["total_loc"] = self.tally.lines_of_code
+        self.project_stats["issues_breakdown"] = defaultdict(int, by_severity)
+        penalty = by_severity["CRITICAL"] * 15 + by_severity["HIGH"] * 10 + by_severity["MEDIUM"] * 5
+        self.project_stats["score"] = max(0, 100 - penalty)
+
+    def _outline(self, rel_path: str, content: str, issues: List[Issue]) -> Optional[FileOutline]:
+        """Packing shape of one file (only needed with a token budget); centrality is filled in later."""
+        if self.token_budget is None:
+            return None
+        return ContextPacker.outline(PackCandidate(
+            path=rel_path,
+            content=content,
+            findings=len(issues),
+            flagged_lines=[i.line for i in issues if i.line],
+            high_stakes=Path(rel_path).name in P4CStandards.HIGH_STAKES_FILES,
+        ))
+
+    def _pack_sources(self) -> Dict[str, PackPlan]:
+        """Which parts of each file fit the token budget, most relevant files first."""
+        paths = [f.path for f in self.files_data]
+        centrality = build_import_graph(self.source_dir, paths, read_ahead=self.read_ahead).centrality()
+        outlines = []
+        for index, f in enumerate(self.files_data):
+            if f.outline is None:
+                f.outline = self._outline(f.path, self._read_text(f), f.issues)
+            f.outline.centrality = centrality[index]
+            outlines.append(f.outline)
+        plans = ContextPacker(self.token_budget).plan(outlines)
+        return {p.path: p for p in plans}
+
+    def _read_text(self, f: FileData) -> str:
+        if f.content is not None:
+            return f.content
+        with open(self.source_dir / f.path, 'r', encoding='utf-8', errors='ignore') as src:
+            return src.read()
+
+    def _write_source(self, out: ReportWriter, f: FileData, plan: Optional[PackPlan]):
+        """The code block body: the packed excerpt, the stored sample, or the file streamed from disk."""
+        try:
+            if plan is not None:
+                out.append(ContextPacker.excerpt(self._read_text(f), plan))
+            elif f.content is not None:
+                out.append(f.content)
+            else:
+                # Text mode with universal newlines decodes exactly like decode_text
+                with open(self.source_dir / f.path, 'r', encoding='utf-8', errors='ignore') as src:
+                    out.append_stream(src)
+        except OSError as e:
+            out.append(f"[could not read {f.path}: {e}]")
 
     def generate_markdown_report(self):
         print("📝 Generating Intelligence Report...")
         
-        md = []
+        try:
+            with open(self.output_file, 'w', encoding='utf-8', buffering=REPORT_BUFFER_BYTES) as f:
+                self._write_markdown(ReportWriter(f))
+            print(f"\n✅ SUCCESS! Report saved to: {self.output_file}")
+        except Exception as e:
+            print(f"\n❌ Error writing report: {e}")
+
+    def _write_markdown(self, md: ReportWriter):
+        """Second pass: header, tree and every file's findings and source, written as they are produced."""
         md.append(f"# Properties 4 Creation PROJECT INTELLIGENCE REPORT")
         md.append(f"**Date:** {datetime.now().isoformat()}  ")
         md.append(f"**Mission:** {P4CStandards.MISSION}  ")
@@ -242,13 +516,18 @@ class P4CIntelligenceEngine:
         # Project Structure (NEW SECTION)
         md.append("## 2. Project Structure")
         md.append("```text")
-        md.append(self._generate_tree(self.source_dir))
+        md.append_pieces(self.iter_tree_lines())
         md.append("```")
         md.append("\n")
 
         # Codebase Dump
         md.append("## 3. Source Code & Analysis")
         self.files_data.sort(key=lambda x: x.path)
+        packed = self._pack_sources() if self.token_budget is not None else {}
+        if packed:
+            used = sum(p.tokens for p in packed.values())
+            md.append(f"*Source excerpts: ~{used} of {self.token_budget} tokens, chosen by finding density, "
+                      f"high-stakes files and import centrality.*\n")
         
         for f in self.files_data:
             md.append(f"### 📄 `{f.path}`")
@@ -263,21 +542,57 @@ class P4CIntelligenceEngine:
             if lang in ['js', 'jsx']: lang = 'javascript'
             if lang in ['ts', 'tsx']: lang = 'typescript'
             
-            md.append(f"\n```{lang}")
-            md.append(f.content)
-            md.append("```\n")
+            plan = packed.get(f.path)
+            if plan is not None and not plan.complete and not plan.lines:
+                md.append("\n*Source omitted (token budget).*\n")
+            else:
+                if plan is not None and not plan.complete:
+                    md.append(f"\n*Excerpt (relevance rank {plan.rank}): signatures and lines around findings.*")
+                md.append(f"\n```{lang}")
+                self._write_source(md, f, plan)
+                md.append("```\n")
             md.append("---")
 
-        try:
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                f.write("\n".join(md))
-            print(f"\n✅ SUCCESS! Report saved to: {self.output_file}")
-        except Exception as e:
-            print(f"\n❌ Error writing report: {e}")
+
+# Engine copy held by each worker process in --jobs mode
+_worker_engine: Optional[P4CIntelligenceEngine] = None
+
+
+def _init_worker(engine: P4CIntelligenceEngine) -> None:
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _analyze_in_worker(rel_path: str, source: Optional[SourceFile], reason: Optional[str]) -> FileData:
+    return _worker_engine._analyze_file(rel_path, source, reason)
+
 
 if __name__ == "__main__":
-    target_dir = sys.argv[1] if len(sys.argv) > 1 else "."
-    engine = P4CIntelligenceEngine(target_dir)
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Properties 4 Creation Intelligence Engine')
+    parser.add_argument('source', nargs='?', default='.', help='Project folder to scan')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Worker processes for file analysis (0 = one per CPU)')
+    parser.add_argument('--cache', action='store_true', help='Reuse results for unchanged files between runs')
+    parser.add_argument('--cache-dir', help=f'Cache location (default: <source>/{CACHE_DIR_NAME})')
+    parser.add_argument('--gitignore', action='store_true', help='Also skip files matched by .gitignore')
+    parser.add_argument('--read-ahead', type=int, default=DEFAULT_READ_AHEAD,
+                        help='Files read concurrently ahead of the analysis, for slow or network filesystems (1 = serial)')
+    parser.add_argument('--generated-files', choices=GENERATED_POLICIES, default='bytes',
+                        help=f'Large (>{LARGE_FILE_BYTES // 1024} KB) or generated files: skip them, scan their raw bytes '
+                             'and show a sample (default), or analyze and dump them like source')
+    parser.add_argument('--tree-depth', type=int, help='Directory levels shown in the Project Structure section')
+    parser.add_argument('--tree-entries', type=int,
+                        help='Entries listed per directory in the Project Structure section (the rest are counted)')
+    parser.add_argument('--token-budget', type=int,
+                        help='Pack source code into about this many tokens instead of including every file in full')
+    args = parser.parse_args()
+
+    engine = P4CIntelligenceEngine(args.source, use_cache=args.cache, cache_dir=args.cache_dir,
+                                   use_gitignore=args.gitignore, token_budget=args.token_budget,
+                                   read_ahead=args.read_ahead, generated_files=args.generated_files,
+                                   tree_max_depth=args.tree_depth, tree_max_entries=args.tree_entries,
+                                   jobs=args.jobs)
     engine.scan_project()
     engine.calculate_metrics()
     engine.generate_markdown_report()
\ No newline at end of file
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Review Engine Benchmark
+=======================
+Generates synthetic React/TypeScript trees and times the review engines
+(CodeReviewAnalyzer, FullPictureAnalyzer, P4CIntelligenceEngine) phase by
+phase: walk, read, scan, score, render, plus an end-to-end total.
+
+Each engine runs in its own subprocess so peak RSS is measured in isolation.
+Results can be saved as a JSON baseline and compared on later commits.
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+import contextlib
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+
+from review_common import SourceFile, decode_text, estimate_tokens, iter_files, walk_project, write_json_object  # noqa: E402
+
+ENGINES = {
+    'code-review': 'code-review.py',
+    'context-review': 'context-review.py',
+    'full-audit': 'full-audit.py',
+}
+
+# Findings injected per 100 generated lines
+DEFAULT_DENSITY = {
+    'console': 2.0,
+    'button': 1.0,
+    'any': 1.0,
+    'data_import': 0.2,
+}
+
+LAYERS = ['pages', 'components', 'services', 'context', 'hooks', 'utils', 'data']
+
+
+# =============================================================================
+# SYNTHETIC TREE
+# =============================================================================
+
+def _component_lines(rng: random.Random, name: str, lines: int, density: Dict[str, float]) -> List[str]:
+    out = [
+        "import React, { useState, useEffect } from 'react';",
+        "import { api } from '../services/api';",
+    ]
+    if rng.random() * 100 < density['data_import'] * lines:
+        out.append("import { properties } from '../data/properties';")
+    out += ['', f'export const {name} = ({{ items }}: {name}Props) => {{',
+            '  const [state, setState] = useState<string | null>(null);']
+
+    hit_rate = {key: value / 100.0 for key, value in density.items() if key != 'data_import'}
+    while len(out) < lines - 3:
+        roll = rng.random()
+        if roll < hit_rate['console']:
+            out.append(f"  console.log('{name} state', state);")
+        elif roll < hit_rate['console'] + hit_rate['button']:
+            out.append('  const action = <button className="rounded-lg px-4" onClick={() => setState(null)}>Go</button>;')
+        elif roll < hit_rate['console'] + hit_rate['button'] + hit_rate['any']:
+            out.append(f'  const payload{len(out)}: any = items[0];')
+        else:
+            out.append(rng.choice([
+                '  useEffect(() => { setState(String(items.length)); }, [items]);',
+                '  const total = items.reduce((sum, item) => sum + item.price, 0);',
+                '  const label = state ? `Selected ${state}` : "Nothing selected";',
+                '  // Keep layout stable while data loads',
+                '  const visible = items.filter((item) => item.available);',
+            ]))
+    out += ['  return <div className="p-4">{label}</div>;', '};', '']
+    return out
+
+
+def generate_tree(root: Path, files: int, lines: int, density: Dict[str, float], seed: int = 1) -> Dict[str, Any]:
+    """Write a synthetic src/ tree of TSX/TS files and return its shape."""
+    rng = random.Random(seed)
+    total_bytes = 0
+    for index in range(files):
+        layer = LAYERS[index % len(LAYERS)]
+        folder = root / 'src' / layer / f'group{index // 50}'
+        folder.mkdir(parents=True, exist_ok=True)
+        name = f'{layer.capitalize()}Item{index}'
+        suffix = '.ts' if layer in ('services', 'utils', 'data') else '.tsx'
+        text = '\n'.join(_component_lines(rng, name, lines, density))
+        (folder / f'{name}{suffix}').write_text(text, encoding='utf-8')
+        total_bytes += len(text.encode('utf-8'))
+    (root / 'package.json').write_text(json.dumps({'dependencies': {'react': '^18.0.0', 'typescript': '^5.0.0'}}))
+    return {'files': files, 'lines_per_file': lines, 'bytes': total_bytes, 'density': density, 'seed': seed}
+
+
+# =============================================================================
+# ENGINE RUNNERS (executed inside a worker subprocess)
+# =============================================================================
+
+def _load_tool(engine: str):
+    spec = importlib.util.spec_from_file_location(engine.replace('-', '_'), HERE / ENGINES[engine])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        yield
+        self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+
+def _bench_code_review(tree: Path, timer: PhaseTimer, devnull):
+    tool = _load_tool('code-review')
+    analyzer = tool.CodeReviewAnalyzer(str(tree))
+    with timer.phase('walk'):
+        files = analyzer.collect_files()
+    with timer.phase('read'):
+        sources = [SourceFile.load(path) for path in files]
+    with timer.phase('scan'):
+        analyses = [analyzer.analyze_path(source.path, source) for source in sources]
+    with timer.phase('score'):
+        analysis = analyzer._summarize(analyses)
+    with timer.phase('render'):
+        devnull.write(analyzer.generate_ai_report(analysis))
+        analyzer.write_json_report(devnull, analysis=analysis)
+    del sources, analyses, analysis
+
+    with timer.phase('total'):
+        analyzer = tool.CodeReviewAnalyzer(str(tree))
+        analyzer.write_json_report(devnull)
+
+
+def _bench_context_review(tree: Path, timer: PhaseTimer, devnull):
+    tool = _load_tool('context-review')
+    analyzer = tool.FullPictureAnalyzer(str(tree))
+    with timer.phase('walk'):
+        analyzer.scan_project_structure()
+    with timer.phase('read'):
+        contents = {path: decode_text((tree / path).read_bytes()) for path in analyzer.context.dependency_map}
+    with timer.phase('scan'):
+        scanned = [(path, analyzer.scan_code_standards(content, path), content[:analyzer.SUMMARY_CHARS])
+                   for path, content in contents.items()]
+    with timer.phase('score'):
+        rule_counts = [0] * len(tool.RULE_TABLE)
+        for _, violations, _ in scanned:
+            for rule_id, _ in violations:
+                rule_counts[rule_id] += 1
+        summary = analyzer._summarize(rule_counts, len(scanned), sum(estimate_tokens(head) for _, _, head in scanned))
+    with timer.phase('render'):
+        write_json_object(devnull, analyzer._report_fields(analyzer._file_records(scanned, None), summary), indent=2)
+    del contents, scanned
+
+    with timer.phase('total'):
+        tool.FullPictureAnalyzer(str(tree)).generate_report()
+
+
+def _bench_full_audit(tree: Path, timer: PhaseTimer, devnull):
+    tool = _load_tool('full-audit')
+    engine = tool.P4CIntelligenceEngine(str(tree))
+    engine.output_file = Path(devnull.name)
+    with timer.phase('walk'):
+        nodes = [node for node in iter_files(walk_project(engine.source_dir, engine.ignore_rules))
+                 if engine._should_process(node.path)]
+    with timer.phase('read'):
+        contents = [(node, decode_text(node.path.read_bytes())) for node in nodes]
+    with timer.phase('scan'):
+        for node, content in contents:
+            rel_path = node.rel_path
+            loc, issues = engine._analyze_source(content, rel_path)
+            engine.record(tool.FileData(
+                path=rel_path, extension=node.path.suffix, loc=loc, issues=issues
+            ))
+    with timer.phase('score'):
+        engine.calculate_metrics()
+    with timer.phase('render'):
+        engine.generate_markdown_report()
+    del contents, engine
+
+    with timer.phase('total'):
+        engine = tool.P4CIntelligenceEngine(str(tree))
+        engine.output_file = Path(devnull.name)
+        engine.scan_project()
+        engine.calculate_metrics()
+        engine.generate_markdown_report()
+
+
+RUNNERS: Dict[str, Callable[[Path, PhaseTimer, Any], None]] = {
+    'code-review': _bench_code_review,
+    'context-review': _bench_context_review,
+    'full-audit': _bench_full_audit,
+}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_worker(engine: str, tree: Path) -> Dict[str, Any]:
+    """Run one engine against `tree` and return its phase timings (called in a subprocess)."""
+    timer = PhaseTimer()
+    workdir = tempfile.mkdtemp(prefix='review-bench-')
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)  # context-review writes reports/ into the cwd
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            RUNNERS[engine](tree, timer, devnull)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {'phases': timer.phases, 'peak_rss_mb': _peak_rss_mb()}
+
+
+# =============================================================================
+# ORCHESTRATION
+# =============================================================================
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(engines: List[str], files: int, lines: int, density: Dict[str, float],
+                   repeat: int = 3, seed: int = 1) -> Dict[str, Any]:
+    """Generate one synthetic tree and benchmark each engine on it, keeping the best of `repeat` runs."""
+    tree = Path(tempfile.mkdtemp(prefix='review-bench-tree-'))
+    try:
+        shape = generate_tree(tree, files, lines, density, seed)
+        megabytes = shape['bytes'] / (1024 * 1024)
+        results: Dict[str, Any] = {}
+        for engine in engines:
+            runs = []
+            for _ in range(repeat):
+                completed = subprocess.run(
+                    [sys.executable, str(Path(__file__).resolve()), '--worker', engine, '--tree', str(tree)],
+                    capture_output=True, text=True, check=True
+                )
+                runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+            phases = {name: min(run['phases'][name] for run in runs) for name in runs[0]['phases']}
+            total = phases.get('total') or sum(phases.values())
+            results[engine] = {
+                'phases_s': {name: round(value, 4) for name, value in phases.items()},
+                'files_per_s': round(files / total, 1) if total else None,
+                'mb_per_s': round(megabytes / total, 2) if total else None,
+                'peak_rss_mb': max(run['peak_rss_mb'] or 0 for run in runs) or None,
+            }
+            print(f"  {engine}: total {total:.3f}s, {results[engine]['files_per_s']} files/s, "
+                  f"{results[engine]['mb_per_s']} MB/s, peak RSS {results[engine]['peak_rss_mb']} MB")
+    finally:
+        shutil.rmtree(tree, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'tree': shape,
+        'engines': results,
+    }
+
+
+def compare_to_baseline(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return one message per phase that got slower than baseline by more than `threshold` (a fraction)."""
+    regressions = []
+    for engine, result in current['engines'].items():
+        base = baseline.get('engines', {}).get(engine)
+        if not base:
+            continue
+        for phase, seconds in result['phases_s'].items():
+            before = base['phases_s'].get(phase)
+            if before and seconds > before * (1 + threshold):
+                regressions.append(f"{engine}/{phase}: {before:.3f}s -> {seconds:.3f}s "
+                                   f"(+{(seconds / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _parse_density(text: str) -> Dict[str, float]:
+    density = dict(DEFAULT_DENSITY)
+    for item in filter(None, text.split(',')):
+        key, _, value = item.partition('=')
+        if key not in density:
+            raise ValueError(f"unknown density key '{key}' (expected one of {', '.join(density)})")
+        density[key] = float(value)
+    return density
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the review engines on a synthetic React tree')
+    parser.add_argument('--files', type=int, default=1000, help='Number of generated TS/TSX files')
+    parser.add_argument('--lines', type=int, default=150, help='Lines per generated file')
+    parser.add_argument('--density', default='', help='Findings per 100 lines, e.g. console=2,button=1,any=1,data_import=0.2')
+    parser.add_argument('--engines', default=','.join(ENGINES), help='Comma-separated engines to run')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per engine (best time is kept)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the synthetic tree')
+    parser.add_argument('--output', '-o', help='Write results JSON here')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results to --baseline instead of comparing')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Allowed slowdown before flagging (0.15 = 15%%)')
+    parser.add_argument('--worker', choices=list(ENGINES), help=argparse.SUPPRESS)
+    parser.add_argument('--tree', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, Path(args.tree))))
+        sys.exit(0)
+
+    try:
+        density = _parse_density(args.density)
+    except ValueError as e:
+        parser.error(str(e))
+    engines = [engine for engine in args.engines.split(',') if engine]
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engine(s): {', '.join(unknown)}")
+
+    print(f"⏱️  Benchmarking {', '.join(engines)} on {args.files} files x {args.lines} lines")
+    results = run_benchmarks(engines, args.files, args.lines, density, repeat=args.repeat, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.output}")
+
+    if args.baseline:
+        if args.save_baseline:
+            with open(args.baseline, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"Baseline saved to: {args.baseline}")
+        else:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                regressions = compare_to_baseline(results, json.load(f), args.threshold)
+            if regressions:
+                print("❌ Regressions against baseline:")
+                for message in regressions:
+                    print(f"   {message}")
+                sys.exit(1)
+            print("✅ No regressions against baseline")
@@ -0,0 +1,2014 @@
+#!/usr/bin/env python3
+"""
+Shared building blocks for the Properties 4 Creation review tools
+(code-review.py, context-review.py, full-audit.py and cr.py).
+"""
+
+import ctypes
+import ctypes.util
+import gzip
+import hashlib
+import io
+import json
+import mmap
+import os
+import posixpath
+import re
+import select
+import sqlite3
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, TextIO, Tuple, Union
+
+# (pattern, severity, category, message) - the rule shape used by every analyzer
+Rule = Tuple[str, str, str, str]
+# Anything re and hashlib accept as raw bytes: bytes, bytearray, mmap
+Buffer = Union[bytes, bytearray, mmap.mmap]
+
+_NEWLINE = re.compile('\n')
+
+# =============================================================================
+# LINE INDEX & RULE ENGINE
+# =============================================================================
+
+class LineIndex:
+    """Newline offsets of one file, built once, for O(log n) offset-to-line lookups."""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.line_starts = [0]
+        self.line_starts.extend(match.end() for match in _NEWLINE.finditer(content))
+
+    def line_number(self, offset: int) -> int:
+        """1-based line number containing `offset`."""
+        return bisect_right(self.line_starts, offset)
+
+    def line(self, line_no: int) -> str:
+        """Text of a 1-based line without its newline, as `content.split('\\n')[line_no - 1]`."""
+        start = self.line_starts[line_no - 1]
+        if line_no < len(self.line_starts):
+            return self.content[start:self.line_starts[line_no] - 1]
+        return self.content[start:]
+
+
+class CompiledRuleSet:
+    """Precompiled scanner for an ordered list of regex rules.
+
+    Each rule is compiled once per process and scanned with its own
+    `finditer`, which keeps the regex engine's literal-prefix search for
+    every rule. (Merging the rules into one alternation with a lookahead probe
+    per hit was measured slower: it loses that search and re-probes every rule
+    at each candidate offset.)
+
+    With binary=True the patterns are compiled as bytes regexes, to scan
+    bytes or mmap buffers without decoding them (character classes such as
+    \\w then match ASCII only).
+    """
+
+    def __init__(self, rules: Tuple[Rule, ...], flags: int = 0, binary: bool = False):
+        self.rules = rules
+        self._patterns = [re.compile(pattern.encode('utf-8') if binary else pattern, flags)
+                          for pattern, _, _, _ in rules]
+
+    def scan(self, content: Union[str, Buffer]) -> List[List[Tuple[int, int]]]:
+        """Return the (start, end) spans of every match, one list per rule in rule order."""
+        return [[match.span() for match in pattern.finditer(content)] for pattern in self._patterns]
+
+    def iter_matches(self, content: Union[str, Buffer]) -> Iterator[Tuple[Rule, int]]:
+        """Yield (rule, match start) pairs in the order per-rule `re.finditer` loops would."""
+        for rule, pattern in zip(self.rules, self._patterns):
+            for match in pattern.finditer(content):
+                yield rule, match.start()
+
+
+@lru_cache(maxsize=None)
+def compile_rules(rules: Tuple[Rule, ...], flags: int = 0, binary: bool = False) -> CompiledRuleSet:
+    """Compile a rule tuple once per process."""
+    return CompiledRuleSet(rules, flags, binary)
+
+
+# =============================================================================
+# FILE LOADING
+# =============================================================================
+
+def decode_text(data: bytes) -> str:
+    """Decode file bytes exactly like `open(path, 'r', encoding='utf-8', errors='ignore').read()`."""
+    return data.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+
+
+@dataclass
+class SourceFile:
+    """One file read from disk with a single open: raw bytes, fstat size, text decoded on first use."""
+    path: Path
+    data: bytes
+    size: int
+
+    @classmethod
+    def load(cls, path: Path) -> 'SourceFile':
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            data = f.read()
+        return cls(path=path, data=data, size=size)
+
+    @cached_property
+    def text(self) -> str:
+        return decode_text(self.data)
+
+    @cached_property
+    def lexed(self) -> Optional['LexedSource']:
+        """Span stream of the text, or None when the extension has no lexer dialect."""
+        return LexedSource.for_path(self.path, self.text)
+
+    def close(self):
+        """Nothing to release; lets callers close whatever load_source returned."""
+
+
+# Reads prefetch() keeps in flight; enough to hide per-file latency of network filesystems
+DEFAULT_READ_AHEAD = 32
+
+
+def prefetch(items: Iterable[Any], load: Callable[[Any], Any],
+             read_ahead: int = DEFAULT_READ_AHEAD) -> Iterator[Tuple[Any, Future]]:
+    """Run `load(item)` on a thread pool, at most `read_ahead` items ahead of the consumer.
+
+    Yields (item, future) in input order as soon as that item is requested;
+    call `future.result()` where the synchronous read used to be (it re-raises
+    the read's exception). Reads overlap each other and the caller's CPU work,
+    so on high-latency storage wall-clock time follows bandwidth rather than
+    file count. read_ahead <= 1 reads serially on the calling thread.
+    """
+    if read_ahead <= 1:
+        for item in items:
+            future = Future()
+            try:
+                future.set_result(load(item))
+            except Exception as e:
+                future.set_exception(e)
+            yield item, future
+        return
+
+    pending: Deque[Tuple[Any, Future]] = deque()
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=read_ahead, thread_name_prefix='prefetch') as pool:
+        try:
+            for item in items:
+                pending.append((item, pool.submit(load, item)))
+                if len(pending) >= read_ahead:
+                    yield pending.popleft()
+            while pending:
+                yield pending.popleft()
+        finally:
+            # Consumer stopped early: drop reads that have not started
+            for _, future in pending:
+                future.cancel()
+
+
+# =============================================================================
+# LARGE & GENERATED FILES
+# =============================================================================
+
+# Files above this size are build or tool artifacts in practice (bundle stats,
+# Lighthouse reports), not hand-written source: they are mapped, never read whole
+LARGE_FILE_BYTES = 512 * 1024
+# Build output by name; contents are never sniffed, so small hand-written files always get the full review
+_GENERATED_NAME = re.compile(r'\.(?:min|bundle|chunk)\.(?:js|mjs|cjs|css)$|\.map$', re.IGNORECASE)
+_LINE_START = re.compile(rb'\n')
+# Every line break decode_text normalizes to '\n'
+_LINE_BREAK = re.compile(rb'\r\n|\r|\n')
+# Policies for generated files: skip them, scan their bytes in place, or treat them as source
+GENERATED_POLICIES = ('skip', 'bytes', 'full')
+
+
+class MappedFile:
+    """A large file mapped read-only instead of read into memory; `data` is an mmap buffer.
+
+    Close it once analyzed: the mapping otherwise stays open until garbage collection.
+    """
+
+    def __init__(self, path: Path, data: Buffer, size: int):
+        self.path = path
+        self.data = data
+        self.size = size
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+def load_source(path: Path, large_file_bytes: int = LARGE_FILE_BYTES) -> Union[SourceFile, MappedFile]:
+    """SourceFile.load, except files over `large_file_bytes` are mapped instead of read."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= large_file_bytes:
+            return SourceFile(path=path, data=f.read(), size=size)
+        # The mapping stays valid after the descriptor is closed
+        return MappedFile(path=path, data=mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size=size)
+
+
+def generated_reason(source: Union[SourceFile, MappedFile]) -> Optional[str]:
+    """Why a file is treated as a build artifact (over the size limit or a bundle/minified/map name), or None."""
+    if isinstance(source, MappedFile):
+        return f'larger than {LARGE_FILE_BYTES // 1024} KB'
+    if _GENERATED_NAME.search(source.path.name):
+        return 'minified/bundled file name'
+    return None
+
+
+_NON_BLANK = re.compile(r'\S')
+# bytes.strip() whitespace plus the separators str.isspace() also accepts
+_NON_BLANK_BYTES = re.compile(rb'[^\s\x1c-\x1f]')
+
+
+def iter_line_spans(content: Union[str, Buffer]) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each line of text or raw bytes, leading whitespace skipped (start == end when blank).
+
+    Lines are those of `content.split('\\n')`; raw bytes split on \\r\\n, \\r and \\n
+    like decode_text, and count only ASCII whitespace as blank. Nothing is
+    copied or decoded, so LOC heuristics can run on mapped files.
+    """
+    if isinstance(content, str):
+        line_break, non_blank = _NEWLINE, _NON_BLANK
+    else:
+        line_break, non_blank = _LINE_BREAK, _NON_BLANK_BYTES
+    start = 0
+    for match in line_break.finditer(content):
+        first = non_blank.search(content, start, match.start())
+        yield (first.start() if first else match.start()), match.start()
+        start = match.end()
+    first = non_blank.search(content, start)
+    yield (first.start() if first else len(content)), len(content)
+
+
+class ByteLines:
+    """LineIndex for undecoded bytes: line numbers by offset, decoding only the lines asked for."""
+
+    def __init__(self, data: Buffer):
+        self.data = data
+        self.line_starts = array('Q', [0])
+        self.line_starts.extend(match.end() for match in _LINE_START.finditer(data))
+
+    def line_number(self, offset: int) -> int:
+        """1-based line number containing byte `offset`."""
+        return bisect_right(self.line_starts, offset)
+
+    def line(self, line_no: int) -> str:
+        start = self.line_starts[line_no - 1]
+        end = self.line_starts[line_no] - 1 if line_no < len(self.line_starts) else len(self.data)
+        return decode_text(self.data[start:end]).rstrip('\n')
+
+    def snippet(self, offset: int, width: int = 200) -> str:
+        """Up to `width` bytes of the line holding `offset`, centred on it (minified lines can be megabytes)."""
+        line_no = self.line_number(offset)
+        line_start = self.line_starts[line_no - 1]
+        line_end = self.line_starts[line_no] - 1 if line_no < len(self.line_starts) else len(self.data)
+        start = max(line_start, min(offset - width // 2, line_end - width))
+        return decode_text(self.data[start:min(line_end, start + width)]).rstrip('\n')
+
+    def head(self, line_count: int, max_bytes: Optional[int] = None) -> str:
+        """The first `line_count` lines (at most `max_bytes` of them), decoded."""
+        end = self.line_starts[line_count] - 1 if line_count < len(self.line_starts) else len(self.data)
+        if max_bytes is not None:
+            end = min(end, max_bytes)
+        return decode_text(self.data[:end])
+
+    def __len__(self) -> int:
+        return len(self.line_starts)
+
+
+# =============================================================================
+# SOURCE LEXING
+# =============================================================================
+
+# Span kinds yielded by iter_spans
+CODE, COMMENT, STRING = 'code', 'comment', 'string'
+Span = Tuple[str, int, int]
+
+LEXER_DIALECTS = {
+    '.ts': 'js', '.tsx': 'js', '.js': 'js', '.jsx': 'js', '.mjs': 'js', '.cjs': 'js',
+    '.css': 'css', '.scss': 'scss', '.less': 'scss',
+}
+
+_LINE_COMMENT = r'//[^\n]*'
+_BLOCK_COMMENT = r'/\*[\s\S]*?(?:\*/|\Z)'
+# Quoted strings stop at an unescaped newline so a stray quote cannot swallow the file
+_QUOTED = r'\'(?:[^\'\\\n]|\\[\s\S])*\'?|"(?:[^"\\\n]|\\[\s\S])*"?'
+
+
+def _token_pattern(first_chars: str, *alternatives: str) -> re.Pattern:
+    # The leading lookahead lets sre skip ahead by character set before trying the alternatives
+    return re.compile(f'(?=[{first_chars}])(?:' + '|'.join(alternatives) + ')')
+
+
+# Comments and strings are matched whole; templates, regex literals and (inside
+# `${...}`) braces need the state machine in iter_spans
+_DIALECT_TOKENS = {
+    'js': _token_pattern('/\'"`', f'(?P<comment>{_LINE_COMMENT}|{_BLOCK_COMMENT})', f'(?P<string>{_QUOTED})',
+                         '(?P<template>`)', '(?P<slash>/)'),
+    'scss': _token_pattern('/\'"', f'(?P<comment>{_LINE_COMMENT}|{_BLOCK_COMMENT})', f'(?P<string>{_QUOTED})'),
+    'css': _token_pattern('/\'"', f'(?P<comment>{_BLOCK_COMMENT})', f'(?P<string>{_QUOTED})'),
+}
+_TEMPLATE_EXPR_TOKENS = _token_pattern(
+    '/\'"`{}', f'(?P<comment>{_LINE_COMMENT}|{_BLOCK_COMMENT})', f'(?P<string>{_QUOTED})',
+    r'(?P<template>[`}])', '(?P<slash>/)', r'(?P<brace>\{)'
+)
+# Template text up to the closing backtick or the next `${`
+_TEMPLATE_BODY = re.compile(r'(?:[^`\\$]|\\[\s\S]|\$(?!\{))*(`|\$\{)?')
+_REGEX_BODY = re.compile(r'(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+_REGEX_PRECEDERS = frozenset('(,=:[!&|?{};+-*%>~^')
+_REGEX_KEYWORDS = frozenset([
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else',
+    'yield', 'await',
+])
+_NOT_NEWLINE = re.compile(r'[^\n]')
+
+
+def _bytes_pattern(pattern: re.Pattern) -> re.Pattern:
+    return re.compile(pattern.pattern.encode('ascii'), pattern.flags & ~re.UNICODE)
+
+
+# The same lexer over raw bytes (iter_spans on a mapped file): the patterns are
+# all ASCII, and multi-byte characters only ever occur inside the tokens
+_DIALECT_TOKENS_BYTES = {dialect: _bytes_pattern(pattern) for dialect, pattern in _DIALECT_TOKENS.items()}
+_TEMPLATE_EXPR_TOKENS_BYTES = _bytes_pattern(_TEMPLATE_EXPR_TOKENS)
+_TEMPLATE_BODY_BYTES = _bytes_pattern(_TEMPLATE_BODY)
+_REGEX_BODY_BYTES = _bytes_pattern(_REGEX_BODY)
+_REGEX_PRECEDERS_BYTES = frozenset(ord(char) for char in _REGEX_PRECEDERS)
+_REGEX_KEYWORDS_BYTES = frozenset(keyword.encode('ascii') for keyword in _REGEX_KEYWORDS)
+# Identifier bytes: ASCII letters, digits, _ and $, plus any byte of a multi-byte character
+_IDENTIFIER_BYTES = frozenset(byte for byte in range(256) if byte >= 0x80 or chr(byte).isalnum() or chr(byte) in '_$')
+
+
+def lexer_dialect(path: Any) -> Optional[str]:
+    """Lexer dialect for a file name, or None when iter_spans does not understand the language."""
+    return LEXER_DIALECTS.get(os.path.splitext(str(path))[1].lower())
+
+
+def _starts_regex(content: str, slash: int) -> bool:
+    """Whether the `/` at `slash` opens a regex literal rather than dividing."""
+    i = slash - 1
+    while i >= 0 and content[i] in ' \t\n':
+        i -= 1
+    if i < 0 or content[i] in _REGEX_PRECEDERS:
+        return True
+    end = i + 1
+    while i >= 0 and (content[i].isalnum() or content[i] in '_$'):
+        i -= 1
+    return content[i + 1:end] in _REGEX_KEYWORDS
+
+
+def _starts_regex_bytes(data: Buffer, slash: int) -> bool:
+    """_starts_regex for raw bytes (a lone \\r is a line break there, as decode_text makes it)."""
+    i = slash - 1
+    while i >= 0 and data[i] in b' \t\r\n':
+        i -= 1
+    if i < 0 or data[i] in _REGEX_PRECEDERS_BYTES:
+        return True
+    end = i + 1
+    while i >= 0 and data[i] in _IDENTIFIER_BYTES:
+        i -= 1
+    return data[i + 1:end] in _REGEX_KEYWORDS_BYTES
+
+
+def iter_spans(content: Union[str, Buffer], dialect: str = 'js') -> Iterator[Span]:
+    """Yield contiguous (kind, start, end) spans covering `content` in one forward pass.
+
+    Handles line and block comments, quoted strings (which end at an unescaped
+    newline), template literals with nested `${...}` expressions and regex
+    literals for 'js'; block comments and strings for 'css' ('scss' adds `//`).
+    Unterminated comments and template literals run to the end of the file.
+    Raw bytes (including an mmap) are lexed in place, without decoding.
+    """
+    if isinstance(content, str):
+        tokens, expr_tokens, template_body, regex_body = (
+            _DIALECT_TOKENS[dialect], _TEMPLATE_EXPR_TOKENS, _TEMPLATE_BODY, _REGEX_BODY)
+        starts_regex, shebang, newline, close_brace, open_expr = _starts_regex, '#!', '\n', '}', '${'
+    else:
+        tokens, expr_tokens, template_body, regex_body = (
+            _DIALECT_TOKENS_BYTES[dialect], _TEMPLATE_EXPR_TOKENS_BYTES, _TEMPLATE_BODY_BYTES, _REGEX_BODY_BYTES)
+        starts_regex, shebang, newline, close_brace, open_expr = _starts_regex_bytes, b'#!', b'\n', b'}', b'${'
+    n = len(content)
+    pos = i = 0
+    if dialect == 'js' and content[:2] == shebang:
+        eol = content.find(newline)
+        pos = i = n if eol < 0 else eol
+        yield COMMENT, 0, pos
+    # One entry per open `${`: how many plain `{` are nested inside it
+    template_depths: List[int] = []
+    while True:
+        match = (expr_tokens if template_depths else tokens).search(content, i)
+        if match is None:
+            break
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind == 'brace':
+            template_depths[-1] += 1
+            i = end
+            continue
+        if kind == 'template':
+            if match.group() == close_brace:
+                if template_depths[-1]:
+                    template_depths[-1] -= 1
+                    i = end
+                    continue
+                template_depths.pop()
+            body = template_body.match(content, end)
+            kind, end = STRING, body.end()
+            if body.group(1) == open_expr:
+                template_depths.append(0)
+        elif kind == 'slash':
+            body = starts_regex(content, start) and regex_body.match(content, end)
+            if not body:
+                i = end
+                continue
+            kind, end = STRING, body.end()
+
+        if start > pos:
+            yield CODE, pos, start
+        yield kind, start, end
+        pos = i = end
+    if pos < n:
+        yield CODE, pos, n
+
+
+class LexedSource:
+    """One lexer pass over a file, shared by LOC counting and rule matching."""
+
+    def __init__(self, content: str, dialect: str = 'js'):
+        self.content = content
+        self.dialect = dialect
+        self.spans: List[Span] = list(iter_spans(content, dialect))
+
+    @classmethod
+    def for_path(cls, path: Any, content: str) -> Optional['LexedSource']:
+        """Lex content according to the file extension, or None for languages the lexer does not know."""
+        dialect = lexer_dialect(path)
+        return cls(content, dialect) if dialect else None
+
+    @cached_property
+    def code(self) -> str:
+        """The content with comments blanked to spaces; offsets and line numbers are unchanged."""
+        content = self.content
+        pieces = []
+        pos = 0
+        for kind, start, end in self.spans:
+            if kind == COMMENT:
+                comment = content[start:end]
+                pieces.append(content[pos:start])
+                pieces.append(_NOT_NEWLINE.sub(' ', comment) if '\n' in comment else ' ' * len(comment))
+                pos = end
+        if not pieces:
+            return content
+        pieces.append(content[pos:])
+        return ''.join(pieces)
+
+    @cached_property
+    def lines_of_code(self) -> int:
+        """Lines holding anything other than whitespace and comments."""
+        return sum(1 for line in self.code.split('\n') if line and not line.isspace())
+
+    @cached_property
+    def _comments(self) -> Tuple[List[int], List[int]]:
+        starts = [start for kind, start, _ in self.spans if kind == COMMENT]
+        ends = [end for kind, _, end in self.spans if kind == COMMENT]
+        return starts, ends
+
+    def comment_end(self, offset: int) -> Optional[int]:
+        """End of the comment holding `offset`, or None when the offset is outside comments."""
+        starts, ends = self._comments
+        i = bisect_right(starts, offset) - 1
+        return ends[i] if i >= 0 and offset < ends[i] else None
+
+    # Matching over the original content that skips comments in place, so rules
+    # need neither the blanked `code` copy nor offset translation.
+
+    def code_search(self, pattern: re.Pattern, pos: int = 0, endpos: Optional[int] = None) -> Optional[re.Match]:
+        """First match of `pattern` in [pos, endpos) that does not start inside a comment."""
+        endpos = len(self.content) if endpos is None else endpos
+        while True:
+            match = pattern.search(self.content, pos, endpos)
+            if match is None:
+                return None
+            pos = self.comment_end(match.start())
+            if pos is None:
+                return match
+
+    def code_finditer(self, pattern: re.Pattern) -> Iterator[re.Match]:
+        """Non-overlapping matches of `pattern` that do not start inside a comment."""
+        pos = 0
+        while True:
+            match = self.code_search(pattern, pos)
+            if match is None:
+                return
+            yield match
+            pos = max(match.end(), match.start() + 1)
+
+    def code_find(self, needle: str, start: int = 0, end: Optional[int] = None) -> int:
+        """str.find that skips occurrences starting inside a comment; -1 when there is none."""
+        end = len(self.content) if end is None else end
+        while True:
+            offset = self.content.find(needle, start, end)
+            if offset < 0:
+                return -1
+            start = self.comment_end(offset)
+            if start is None:
+                return offset
+
+
+def lexed_lines_of_code(path: Any, data: Buffer) -> Optional[int]:
+    """LexedSource.lines_of_code of a file's raw bytes, or None when the lexer does not cover its type.
+
+    The bytes are lexed in place (mapped files are neither copied nor decoded);
+    a line counts once any non-comment span puts a non-blank byte on it.
+    """
+    dialect = lexer_dialect(path)
+    if not dialect:
+        return None
+    count = 0
+    next_line = 0  # offset where the first line not yet counted starts
+    for kind, start, end in iter_spans(data, dialect):
+        if kind == COMMENT:
+            continue
+        pos = max(start, next_line)
+        while pos < end:
+            hit = _NON_BLANK_BYTES.search(data, pos, end)
+            if hit is None:
+                break
+            count += 1
+            line_break = _LINE_BREAK.search(data, hit.end())
+            next_line = pos = line_break.end() if line_break else len(data)
+    return count
+
+
+# =============================================================================
+# PROJECT WALKER
+# =============================================================================
+
+def _glob_to_regex(glob: str) -> str:
+    """Translate one gitignore glob (no leading/trailing slash handling) to a regex body."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if glob.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if glob.startswith('**', i):
+            out.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = glob.find(']', i + 2)
+            if end < 0:
+                out.append('\\[')
+            else:
+                body = glob[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class GitignoreRules:
+    """Patterns from one .gitignore, compiled once and matched against paths relative to its directory."""
+
+    def __init__(self, lines: Iterable[str]):
+        # (regex, negated, directory-only), in file order; the last match wins
+        self.patterns: List[Tuple['re.Pattern[str]', bool, bool]] = []
+        for raw in lines:
+            line = raw.rstrip('\n').rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            # A slash anywhere but the end anchors the pattern to this directory
+            anchored = '/' in line
+            body = _glob_to_regex(line.lstrip('/'))
+            regex = re.compile(('^' if anchored else '(?:^|/)') + body + '$')
+            self.patterns.append((regex, negated, dir_only))
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['GitignoreRules']:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                rules = cls(f)
+        except OSError:
+            return None
+        return rules if rules.patterns else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True/False if a pattern decides (ignored / re-included), None if none applies."""
+        for regex, negated, dir_only in reversed(self.patterns):
+            if dir_only and not is_dir:
+                continue
+            if regex.search(rel_path):
+                return not negated
+        return None
+
+
+class IgnoreRules:
+    """Compiled ignore policy for one project: excluded directory/file names plus optional .gitignore files."""
+
+    def __init__(self, root: Path, dir_names: Iterable[str] = (), file_names: Iterable[str] = (),
+                 use_gitignore: bool = False):
+        self.root = Path(root)
+        self.dir_names = frozenset(dir_names)
+        self.file_names = frozenset(file_names)
+        self.use_gitignore = use_gitignore
+        self._gitignores: Dict[str, Optional[GitignoreRules]] = {}
+
+    def gitignore_for(self, rel_dir: str) -> Optional[GitignoreRules]:
+        """Rules from `<rel_dir>/.gitignore`, parsed once."""
+        if rel_dir not in self._gitignores:
+            self._gitignores[rel_dir] = GitignoreRules.load(self.root / rel_dir / '.gitignore')
+        return self._gitignores[rel_dir]
+
+    def _gitignored(self, rel_path: str, is_dir: bool) -> bool:
+        # Deeper .gitignore files take precedence over shallower ones
+        parts = rel_path.split('/')
+        for depth in range(len(parts) - 1, -1, -1):
+            base = '/'.join(parts[:depth])
+            rules = self.gitignore_for(base)
+            if rules is not None:
+                decision = rules.match('/'.join(parts[depth:]), is_dir)
+                if decision is not None:
+                    return decision
+        return False
+
+    def skips(self, rel_path: str, name: str, is_dir: bool) -> bool:
+        """Whether one entry is excluded (its parents are assumed to be walked)."""
+        if name in (self.dir_names if is_dir else self.file_names):
+            return True
+        return self.use_gitignore and self._gitignored(rel_path, is_dir)
+
+    def ignores(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Whether a path, or any directory above it, is excluded."""
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts)):
+            if self.skips('/'.join(parts[:depth]), parts[depth - 1], True):
+                return True
+        return self.skips(rel_path, parts[-1], is_dir)
+
+
+@dataclass
+class TreeNode:
+    """One walked entry. Directories carry their children sorted directories-first, then by name."""
+    name: str
+    path: Path
+    rel_path: str
+    is_dir: bool
+    children: List['TreeNode'] = field(default_factory=list)
+    access_denied: bool = False
+
+
+def walk_project(root: Path, rules: IgnoreRules) -> TreeNode:
+    """Walk `root` once with os.scandir, reusing each DirEntry's cached type, and return the tree.
+
+    Ignored directories are pruned; symlinked directories are listed but not
+    entered (like os.walk). Both file lists and tree renderings come from
+    this single traversal.
+    """
+    root = Path(root)
+    top = TreeNode(name=root.name, path=root, rel_path='', is_dir=True)
+    stack = [top]
+    while stack:
+        node = stack.pop()
+        try:
+            with os.scandir(node.path) as entries:
+                for entry in entries:
+                    is_dir = entry.is_dir()
+                    rel_path = f'{node.rel_path}/{entry.name}' if node.rel_path else entry.name
+                    if rules.skips(rel_path, entry.name, is_dir):
+                        continue
+                    child = TreeNode(name=entry.name, path=node.path / entry.name, rel_path=rel_path, is_dir=is_dir)
+                    node.children.append(child)
+                    if is_dir and not entry.is_symlink():
+                        stack.append(child)
+        except OSError:
+            node.access_denied = True
+        node.children.sort(key=lambda child: (not child.is_dir, child.name.lower()))
+    return top
+
+
+def iter_files(node: TreeNode) -> Iterator[TreeNode]:
+    """Every file below `node`, depth-first in tree order."""
+    for child in node.children:
+        if child.is_dir:
+            yield from iter_files(child)
+        else:
+            yield child
+
+
+# =============================================================================
+# GIT SCOPING
+# =============================================================================
+
+# New-side line range of a diff hunk: "@@ -a,b +start,count @@"
+_HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
+def _git(cwd: Path, *args: str) -> str:
+    try:
+        result = subprocess.run(['git', '-c', 'core.quotepath=off', *args], cwd=cwd, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise RuntimeError('git is not installed or not on PATH')
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"git {' '.join(args)} failed: {e.stderr.decode('utf-8', errors='ignore').strip()}")
+    return result.stdout.decode('utf-8', errors='surrogateescape')
+
+
+_GIT_PATH_ESCAPE = re.compile(rb'\\([0-7]{3}|.)')
+_GIT_PATH_ESCAPES = {b'a': b'\a', b'b': b'\b', b't': b'\t', b'n': b'\n', b'v': b'\v', b'f': b'\f', b'r': b'\r'}
+
+
+def _git_patch_path(header: str) -> Optional[str]:
+    """Repo-relative path of a `+++ b/<path>` patch header, or None (e.g. /dev/null).
+
+    Git ends names holding spaces with a tab, and C-quotes names with special
+    characters (`"b/a\\"b"`, octal escapes for raw bytes); both are undone here.
+    """
+    name = header[4:]
+    if name.startswith('"'):
+        quoted = name[1:name.rindex('"')].encode('utf-8', errors='surrogateescape')
+        name = _GIT_PATH_ESCAPE.sub(
+            lambda m: bytes([int(m.group(1), 8)]) if len(m.group(1)) == 3 else _GIT_PATH_ESCAPES.get(m.group(1), m.group(1)),
+            quoted
+        ).decode('utf-8', errors='surrogateescape')
+    else:
+        name = name.rstrip('\t')
+    return name[2:] if name.startswith('b/') else None
+
+
+def git_changed_lines(cwd: Path, since: Optional[str] = None,
+                      staged: bool = False) -> Dict[Path, Optional[List[Tuple[int, int]]]]:
+    """Files changed in git, mapped to their added/modified line ranges (None = whole file).
+
+    `staged` compares the index with HEAD. Otherwise the working tree is
+    compared with the merge-base of `since` and HEAD (so a PR branch only sees
+    its own changes), and untracked files are included whole.
+    """
+    top = Path(_git(cwd, 'rev-parse', '--show-toplevel').strip())
+    if staged:
+        diff_args = ['--cached']
+    else:
+        diff_args = [_git(top, 'merge-base', since or 'HEAD', 'HEAD').strip()]
+
+    names = _git(top, 'diff', '--name-only', '-z', '--diff-filter=ACMRT', *diff_args).split('\0')
+    changed: Dict[Path, Optional[List[Tuple[int, int]]]] = {top / name: None for name in names if name}
+
+    current: Optional[Path] = None
+    patch = _git(top, 'diff', '-U0', '--no-color', '--no-ext-diff', '--diff-filter=ACMRT', *diff_args)
+    # Only \n ends a patch line; names may hold other characters splitlines() breaks on
+    for line in patch.split('\n'):
+        if line.startswith('+++ '):
+            name = _git_patch_path(line)
+            current = top / name if name is not None else None
+            if current in changed:
+                changed[current] = []
+        elif current is not None and line.startswith('@@'):
+            hunk = _HUNK_HEADER.match(line)
+            if hunk and current in changed:
+                start, count = int(hunk.group(1)), int(hunk.group(2) or 1)
+                if count:
+                    changed[current].append((start, start + count - 1))
+
+    if not staged:
+        for name in _git(top, 'ls-files', '--others', '--exclude-standard', '-z').split('\0'):
+            if name:
+                changed[top / name] = None
+    return changed
+
+
+# =============================================================================
+# INCREMENTAL ANALYSIS CACHE
+# =============================================================================
+
+CACHE_DIR_NAME = '.review-cache'
+
+
+def rules_fingerprint(*parts: Any) -> str:
+    """Hash the active rule set plus the analyzer sources, so any rule or logic change invalidates the cache."""
+    digest = hashlib.sha256()
+    digest.update(Path(__file__).read_bytes())
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Persistent per-file analysis results keyed by content hash and rule-set fingerprint.
+
+    Entries are stored in one JSON file per tool. A lookup hits only when the
+    file's content digest (which folds in the fingerprint) matches, so edited
+    files and rule changes both miss. The store keeps at most `max_entries`,
+    evicting the least recently used when saved.
+    """
+
+    def __init__(self, path: Path, fingerprint: str, max_entries: int = 20000):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.run = 0
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if stored.get('fingerprint') != self.fingerprint:
+            # Rules or analyzer changed - every stored result is stale
+            self.evictions += len(stored.get('entries', {}))
+            return
+        self.run = stored.get('run', 0) + 1
+        self.entries = stored.get('entries', {})
+
+    def digest(self, data: Buffer) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode('ascii'))
+        digest.update(data)  # bytes or an mmap, hashed without copying
+        return digest.hexdigest()
+
+    def get(self, key: str, digest: str) -> Optional[Any]:
+        """Return the cached value for `key` if its content digest still matches."""
+        entry = self.entries.get(key)
+        if entry is None or entry['digest'] != digest:
+            self.misses += 1
+            return None
+        entry['run'] = self.run
+        self.hits += 1
+        return entry['value']
+
+    def put(self, key: str, digest: str, value: Any):
+        self.entries[key] = {'digest': digest, 'run': self.run, 'value': value}
+
+    def save(self):
+        """Evict down to `max_entries` (least recently used first) and write atomically."""
+        if len(self.entries) > self.max_entries:
+            by_age = sorted(self.entries, key=lambda k: self.entries[k]['run'])
+            for key in by_age[:len(self.entries) - self.max_entries]:
+                del self.entries[key]
+                self.evictions += 1
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'run': self.run, 'entries': self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return (f"Cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), "
+                f"{self.evictions} evicted, {len(self.entries)} stored")
+
+
+# =============================================================================
+# IMPORT GRAPH
+# =============================================================================
+
+# import ... from 'x' / import 'x' / export ... from 'x' / require('x') / import('x')
+_IMPORT_SPECIFIER = re.compile(
+    r'''\b(?:import|export)\s+(?:[\w*$\s{},]+?\s*\bfrom\s*)?(['"])([^'"\n]+)\1'''
+    r'''|\b(?:require|import)\s*\(\s*(['"])([^'"\n]+)\3\s*\)'''
+)
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+MODULE_EXTENSIONS = ('.ts', '.tsx', '.js', '.jsx', '.mjs', '.cjs')
+# `./x.js` in TypeScript ESM code usually names the `./x.ts` source
+_COMPILED_EXTENSIONS = {'.js': ('.ts', '.tsx'), '.jsx': ('.tsx',), '.mjs': ('.mts',), '.cjs': ('.cts',)}
+
+
+def extract_imports(content: str, dialect: str = 'js') -> List[str]:
+    """Module specifiers a JS/TS file imports, re-exports or requires, deduplicated in source order."""
+    code = LexedSource(content, dialect).code
+    specifiers = (match.group(2) or match.group(4) for match in _IMPORT_SPECIFIER.finditer(code))
+    return list(dict.fromkeys(specifiers))
+
+
+def _imports_in_worker(item: Tuple[str, bytes]) -> List[str]:
+    path, data = item
+    return extract_imports(decode_text(data), lexer_dialect(path) or 'js')
+
+
+def _load_tsconfig(path: Path, seen: Set[Path]) -> Dict[str, Any]:
+    """compilerOptions of a tsconfig (JSON with comments), following relative `extends` and `references`.
+
+    Returns {'baseUrl': dir or None, 'paths': {pattern: [target dirs...]}, 'paths_dir': dir}
+    with directories made absolute, so settings from different files can be merged.
+    """
+    path = path.resolve()
+    if path in seen or not path.is_file():
+        return {}
+    seen.add(path)
+    try:
+        text = LexedSource(decode_text(path.read_bytes())).code
+        config = json.loads(_TRAILING_COMMA.sub(r'\1', text))
+    except (OSError, ValueError):
+        return {}
+
+    merged: Dict[str, Any] = {}
+    extends = config.get('extends')
+    if isinstance(extends, str) and extends.startswith('.'):
+        target = path.parent / extends
+        merged.update(_load_tsconfig(target if target.suffix == '.json' else target.with_suffix('.json'), seen))
+    options = config.get('compilerOptions') or {}
+    if 'baseUrl' in options:
+        merged['baseUrl'] = path.parent / options['baseUrl']
+    if 'paths' in options:
+        merged['paths'] = options['paths']
+        merged['paths_dir'] = path.parent
+    for reference in config.get('references') or []:
+        ref_path = path.parent / reference.get('path', '')
+        ref_options = _load_tsconfig(ref_path / 'tsconfig.json' if ref_path.is_dir() else ref_path, seen)
+        for key, value in ref_options.items():
+            merged.setdefault(key, value)
+    return merged
+
+
+class ModuleResolver:
+    """Maps import specifiers to project files the way TypeScript's bundler resolution does.
+
+    Handles relative specifiers, tsconfig `paths` aliases (longest prefix wins)
+    and `baseUrl` lookups, trying the listed extensions and `index` files.
+    Only files in `files` (POSIX paths relative to `root`) are resolution
+    targets, so no file system calls are made per import.
+    """
+
+    def __init__(self, root: Path, files: Iterable[str], tsconfig: str = 'tsconfig.json'):
+        self.root = Path(root).resolve()
+        self.files = set(files)
+        options = _load_tsconfig(self.root / tsconfig, set())
+        self.base_url = self._relative(options['baseUrl']) if 'baseUrl' in options else None
+        paths_dir = options.get('baseUrl') or options.get('paths_dir') or self.root
+        # (prefix, suffix, target patterns) sorted so the longest prefix is tried first
+        self.aliases: List[Tuple[str, Optional[str], List[str]]] = []
+        for pattern, targets in (options.get('paths') or {}).items():
+            prefix, star, suffix = pattern.partition('*')
+            resolved = [self._relative(paths_dir / target) for target in targets if isinstance(target, str)]
+            self.aliases.append((prefix, suffix if star else None, [t for t in resolved if t is not None]))
+        self.aliases.sort(key=lambda alias: len(alias[0]), reverse=True)
+
+    def _relative(self, path: Path) -> Optional[str]:
+        """POSIX path of `path` relative to the root ('' for the root itself), None when outside it."""
+        rel = os.path.relpath(os.path.normpath(path), self.root).replace(os.sep, '/')
+        if rel == '..' or rel.startswith('../'):
+            return None
+        return '' if rel == '.' else rel
+
+    def _find(self, base: str) -> Optional[str]:
+        """The project file a module path without extension (or with a compiled one) refers to."""
+        base = posixpath.normpath(base)
+        if base.startswith('../') or base == '..':
+            return None
+        if base == '.':
+            base = ''
+        if base in self.files:
+            return base
+        stem, ext = posixpath.splitext(base)
+        for source_ext in _COMPILED_EXTENSIONS.get(ext, ()):
+            if stem + source_ext in self.files:
+                return stem + source_ext
+        candidates = [base + ext for ext in MODULE_EXTENSIONS]
+        candidates.extend(posixpath.join(base, 'index' + ext) for ext in MODULE_EXTENSIONS)
+        for candidate in candidates:
+            if candidate in self.files:
+                return candidate
+        return None
+
+    def resolve(self, importer: str, specifier: str) -> Optional[str]:
+        """Project file imported by `specifier` from the file `importer`, or None for packages and misses."""
+        if specifier.startswith(('./', '../')) or specifier in ('.', '..'):
+            return self._find(posixpath.join(posixpath.dirname(importer), specifier))
+        if specifier.startswith('/'):
+            return None
+        for prefix, suffix, targets in self.aliases:
+            if suffix is None:
+                if specifier != prefix:
+                    continue
+                matched = ''
+            elif specifier.startswith(prefix) and specifier.endswith(suffix) and \
+                    len(specifier) >= len(prefix) + len(suffix):
+                matched = specifier[len(prefix):len(specifier) - len(suffix)]
+            else:
+                continue
+            for target in targets:
+                found = self._find(target.replace('*', matched, 1))
+                if found:
+                    return found
+            return None
+        if self.base_url is not None:
+            return self._find(posixpath.join(self.base_url, specifier))
+        return None
+
+
+def _csr(count: int, edges: List[Tuple[int, int]]) -> Tuple['array', 'array']:
+    """Compressed sparse rows: targets of node i are targets[offsets[i]:offsets[i + 1]], in edge order."""
+    offsets = array('I', bytes(4 * (count + 1)))
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    fill = offsets[:-1]
+    targets = array('I', bytes(4 * len(edges)))
+    for source, target in edges:
+        targets[fill[source]] = target
+        fill[source] += 1
+    return offsets, targets
+
+
+class ImportGraph:
+    """Project import graph with integer node ids and array-backed edges in both directions.
+
+    Nodes are the project files; an edge runs from a file to each project file
+    it imports or re-exports. Forward and reverse adjacency are stored as
+    compressed sparse rows (two flat unsigned-int arrays each), so the graph
+    costs a few bytes per edge and reverse lookups are as cheap as forward ones.
+    """
+
+    def __init__(self, paths: List[str], edges: List[Tuple[int, int]]):
+        self.paths = paths
+        self.ids = {path: i for i, path in enumerate(paths)}
+        self._dep_offsets, self._dep_targets = _csr(len(paths), edges)
+        self._rdep_offsets, self._rdep_targets = _csr(len(paths), [(target, source) for source, target in edges])
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._dep_targets)
+
+    def dependency_ids(self, node: int) -> 'array':
+        return self._dep_targets[self._dep_offsets[node]:self._dep_offsets[node + 1]]
+
+    def dependent_ids(self, node: int) -> 'array':
+        return self._rdep_targets[self._rdep_offsets[node]:self._rdep_offsets[node + 1]]
+
+    def dependencies(self, path: str) -> List[str]:
+        """Project files `path` imports directly."""
+        return [self.paths[i] for i in self.dependency_ids(self.ids[path])]
+
+    def dependents(self, path: str) -> List[str]:
+        """Project files that import `path` directly."""
+        return [self.paths[i] for i in self.dependent_ids(self.ids[path])]
+
+    def centrality(self) -> List[float]:
+        """Direct dependents per node scaled to 0..1 (the most imported file scores 1)."""
+        offsets = self._rdep_offsets
+        degrees = [offsets[i + 1] - offsets[i] for i in range(len(self.paths))]
+        top = max(degrees, default=0) or 1
+        return [degree / top for degree in degrees]
+
+    def reachable(self, paths: Iterable[str], dependents: bool = True, dependencies: bool = False,
+                  max_depth: Optional[int] = None) -> List[str]:
+        """Transitive closure of `paths` (which come first), breadth-first so nearer files are listed earlier.
+
+        `dependents` follows the reverse index (everything that can be affected
+        when `paths` change); `dependencies` follows imports. `max_depth` caps
+        the number of hops. Raises ValueError for paths not in the graph.
+        """
+        paths = list(paths)
+        unknown = [path for path in paths if path not in self.ids]
+        if unknown:
+            raise ValueError(f"not in the import graph: {', '.join(unknown)}")
+        seen = bytearray(len(self.paths))
+        order: List[int] = []
+        for path in paths:
+            node = self.ids[path]
+            if not seen[node]:
+                seen[node] = 1
+                order.append(node)
+        steps = []
+        if dependents:
+            steps.append((self._rdep_offsets, self._rdep_targets))
+        if dependencies:
+            steps.append((self._dep_offsets, self._dep_targets))
+
+        level_start, depth = 0, 0
+        while level_start < len(order) and (max_depth is None or depth < max_depth):
+            level_end = len(order)
+            for node in order[level_start:level_end]:
+                for offsets, targets in steps:
+                    for neighbour in targets[offsets[node]:offsets[node + 1]]:
+                        if not seen[neighbour]:
+                            seen[neighbour] = 1
+                            order.append(neighbour)
+            level_start, depth = level_end, depth + 1
+        return [self.paths[node] for node in order]
+
+
+def build_import_graph(root: Path, paths: List[str], jobs: int = 1, cache: Optional[AnalysisCache] = None,
+                       read_ahead: int = DEFAULT_READ_AHEAD) -> ImportGraph:
+    """Parse and resolve the imports of every file in `paths` (relative to `root`).
+
+    Files are read concurrently (see prefetch). Specifier extraction runs in a
+    process pool when `jobs` > 1 and is cached per content hash; resolution is
+    done afterwards against the full file list. Unreadable files become nodes
+    without edges.
+    """
+    root = Path(root)
+    posix_paths = [Path(path).as_posix() for path in paths]
+    specifiers: List[List[str]] = [[] for _ in paths]
+    misses: List[Tuple[int, str, bytes, Optional[str]]] = []
+    for (i, path), pending in prefetch(enumerate(posix_paths), lambda item: (root / item[1]).read_bytes(), read_ahead):
+        try:
+            data = pending.result()
+        except OSError:
+            continue
+        digest = cache.digest(data) if cache is not None else None
+        cached = cache.get(path, digest) if cache is not None else None
+        if cached is not None:
+            specifiers[i] = cached
+        else:
+            misses.append((i, path, data, digest))
+
+    items = [(path, data) for _, path, data, _ in misses]
+    if jobs > 1 and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            extracted = list(pool.map(_imports_in_worker, items, chunksize=max(1, len(items) // (jobs * 4))))
+    else:
+        extracted = [_imports_in_worker(item) for item in items]
+    for (i, path, _, digest), found in zip(misses, extracted):
+        specifiers[i] = found
+        if cache is not None:
+            cache.put(path, digest, found)
+
+    resolver = ModuleResolver(root, posix_paths)
+    ids = {path: i for i, path in enumerate(posix_paths)}
+    edges = []
+    for i, path in enumerate(posix_paths):
+        targets = (resolver.resolve(path, specifier) for specifier in specifiers[i])
+        for target in dict.fromkeys(t for t in targets if t is not None and t != path):
+            edges.append((i, ids[target]))
+    return ImportGraph(list(paths), edges)
+
+
+# =============================================================================
+# CONTEXT PACKING
+# =============================================================================
+
+# Top-level declarations worth keeping when a file cannot be included whole
+_SIGNATURE_LINE = re.compile(
+    r'^(?:export\b|(?:async\s+)?function\b|(?:abstract\s+)?class\b|interface\b|type\s+[\w$]+|enum\b'
+    r'|(?:const|let)\s+[\w$]+\s*(?::[^=\n]+)?=\s*(?:async\s*)?(?:\([^)\n]*\)|[\w$]+)\s*(?::[^=\n]+)?=>)',
+    re.MULTILINE
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count: about four characters per token for source code."""
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class PackCandidate:
+    """A file competing for a place in the packed context, with the signals used to rank it."""
+    path: str
+    content: str
+    findings: int = 0
+    flagged_lines: List[int] = field(default_factory=list)  # 1-based lines with findings
+    high_stakes: bool = False
+    centrality: float = 0.0  # 0..1, see ImportGraph.centrality()
+
+
+@dataclass
+class FileOutline:
+    """Content-free shape of a PackCandidate: enough to rank it and price every possible excerpt."""
+    path: str
+    line_lengths: array  # characters per line, newline excluded
+    nonblank_lines: int
+    signature_lines: List[int]
+    findings: int = 0
+    flagged_lines: List[int] = field(default_factory=list)
+    high_stakes: bool = False
+    centrality: float = 0.0
+
+
+@dataclass
+class PackPlan:
+    """Which lines of one file fit the budget: all of them, some (`lines`), or none."""
+    path: str
+    lines: FrozenSet[int]
+    complete: bool
+    tokens: int
+    rank: int
+    score: float
+
+
+@dataclass
+class PackedFile:
+    """What made it into the budget for one file: the full text, an excerpt, or nothing."""
+    path: str
+    text: str
+    tokens: int
+    complete: bool
+    rank: int
+    score: float
+
+
+def _omitted_marker(first: int, last: int) -> str:
+    return f'... [lines {first}-{last} omitted]'
+
+
+class ContextPacker:
+    """Fits the most useful parts of many files into one token budget.
+
+    Files are ranked by violation density (findings per non-blank line),
+    high-stakes membership and import-graph centrality. Space is then handed
+    out in rounds so every highly ranked file gets its skeleton before any file
+    gets its body: first signatures and exports, then a few lines around each
+    finding, then the complete file. Within a round files are visited in rank
+    order and anything that does not fit is skipped in favour of smaller ones.
+
+    Planning only needs FileOutlines, so callers that cannot hold every file
+    in memory outline each file as they go, plan once, then re-read and
+    render() just the files that made it in.
+    """
+
+    def __init__(self, budget: int, window: int = 2, density_weight: float = 1.0,
+                 high_stakes_weight: float = 1.0, centrality_weight: float = 1.0):
+        self.budget = budget
+        self.window = window
+        self.weights = (density_weight, high_stakes_weight, centrality_weight)
+
+    @staticmethod
+    def outline(candidate: PackCandidate) -> FileOutline:
+        lines = candidate.content.split('\n')
+        lexed = LexedSource.for_path(candidate.path, candidate.content)
+        signature_lines = []
+        if lexed is not None:
+            line_index = LineIndex(lexed.code)
+            signature_lines = sorted({line_index.line_number(match.start())
+                                      for match in _SIGNATURE_LINE.finditer(lexed.code)})
+        return FileOutline(
+            path=candidate.path,
+            line_lengths=array('I', map(len, lines)),
+            nonblank_lines=sum(1 for line in lines if line.strip()),
+            signature_lines=signature_lines,
+            findings=candidate.findings,
+            flagged_lines=candidate.flagged_lines,
+            high_stakes=candidate.high_stakes,
+            centrality=candidate.centrality,
+        )
+
+    def score(self, outlines: List[FileOutline]) -> List[float]:
+        densities = [o.findings / o.nonblank_lines if o.nonblank_lines else 0.0 for o in outlines]
+        top_density = max(densities, default=0.0) or 1.0
+        density_weight, high_stakes_weight, centrality_weight = self.weights
+        return [
+            density_weight * density / top_density
+            + high_stakes_weight * outline.high_stakes
+            + centrality_weight * outline.centrality
+            for outline, density in zip(outlines, densities)
+        ]
+
+    def _window_lines(self, outline: FileOutline) -> Set[int]:
+        line_count = len(outline.line_lengths)
+        lines = set()
+        for line in outline.flagged_lines:
+            lines.update(range(max(1, line - self.window), min(line_count, line + self.window) + 1))
+        return lines
+
+    @staticmethod
+    def _rendered_length(line_lengths: array, selected: Set[int]) -> int:
+        """len(render(lines, selected)) computed from the line lengths alone."""
+        pieces = 0
+        length = 0
+        previous = 0
+        for line_no in sorted(selected):
+            if line_no > previous + 1:
+                length += len(_omitted_marker(previous + 1, line_no - 1))
+                pieces += 1
+            length += line_lengths[line_no - 1]
+            pieces += 1
+            previous = line_no
+        if previous < len(line_lengths):
+            length += len(_omitted_marker(previous + 1, len(line_lengths)))
+            pieces += 1
+        return length + max(pieces - 1, 0)
+
+    @staticmethod
+    def render(lines: List[str], selected: Iterable[int]) -> str:
+        """Selected 1-based lines in order, with a marker wherever lines were left out."""
+        out = []
+        previous = 0
+        for line_no in sorted(selected):
+            if line_no > len(lines):
+                break  # the file shrank since it was outlined
+            if line_no > previous + 1:
+                out.append(_omitted_marker(previous + 1, line_no - 1))
+            out.append(lines[line_no - 1])
+            previous = line_no
+        if previous < len(lines):
+            out.append(_omitted_marker(previous + 1, len(lines)))
+        return '\n'.join(out)
+
+    @classmethod
+    def excerpt(cls, content: str, plan: PackPlan) -> str:
+        """The text `plan` selected from `content`."""
+        if plan.complete:
+            return content
+        if not plan.lines:
+            return ''
+        return cls.render(content.split('\n'), plan.lines)
+
+    def plan(self, outlines: List[FileOutline]) -> List[PackPlan]:
+        """One PackPlan per outline, in input order; total tokens stay within the budget."""
+        scores = self.score(outlines)
+        order = sorted(range(len(outlines)), key=lambda i: (-scores[i], outlines[i].path))
+        selected: List[Set[int]] = [set() for _ in outlines]
+        costs = [0] * len(outlines)
+        complete = [False] * len(outlines)
+        remaining = self.budget
+
+        rounds = [
+            lambda i: set(outlines[i].signature_lines),
+            lambda i: self._window_lines(outlines[i]),
+            lambda i: None,  # the whole file
+        ]
+        for wanted_lines in rounds:
+            for i in order:
+                if complete[i] or remaining <= 0:
+                    continue
+                line_lengths = outlines[i].line_lengths
+                wanted = wanted_lines(i)
+                if wanted is None:
+                    length = sum(line_lengths) + len(line_lengths) - 1
+                else:
+                    wanted = selected[i] | wanted
+                    if wanted == selected[i]:
+                        continue
+                    length = self._rendered_length(line_lengths, wanted)
+                cost = (length + 3) // 4  # estimate_tokens of the rendered text
+                if cost - costs[i] > remaining:
+                    continue
+                remaining -= cost - costs[i]
+                costs[i] = cost
+                if wanted is None or len(wanted) == len(line_lengths):
+                    complete[i] = True
+                else:
+                    selected[i] = wanted
+
+        ranks = {i: rank for rank, i in enumerate(order, 1)}
+        return [
+            PackPlan(path=outline.path, lines=frozenset(selected[i]), complete=complete[i], tokens=costs[i],
+                     rank=ranks[i], score=round(scores[i], 4))
+            for i, outline in enumerate(outlines)
+        ]
+
+    def pack(self, candidates: List[PackCandidate]) -> List[PackedFile]:
+        """One PackedFile per candidate, in input order; total tokens stay within the budget."""
+        plans = self.plan([self.outline(candidate) for candidate in candidates])
+        return [
+            PackedFile(path=plan.path, text=self.excerpt(candidate.content, plan), tokens=plan.tokens,
+                       complete=plan.complete, rank=plan.rank, score=plan.score)
+            for candidate, plan in zip(candidates, plans)
+        ]
+
+
+# =============================================================================
+# STREAMING JSON OUTPUT
+# =============================================================================
+
+class StreamedArray:
+    """Marks an iterable that write_json_object should emit element by element."""
+
+    def __init__(self, items: Iterable[Any]):
+        self.items = items
+
+
+class StreamedObject:
+    """Marks (key, value) pairs that write_json_object should emit as a nested object, field by field."""
+
+    def __init__(self, fields: Iterable[Tuple[str, Any]]):
+        self.fields = fields
+
+
+def write_json_object(stream: TextIO, fields: Iterable[Tuple[str, Any]], indent: Optional[int] = 2, depth: int = 0):
+    """Write a JSON object field by field, byte-identical to `json.dump(dict(fields), indent=indent)`.
+
+    Plain values are serialized one at a time; StreamedArray and
+    StreamedObject values are consumed lazily, so a report never has to exist
+    as one dict or string. indent=None writes the most compact form
+    (`separators=(',', ':')`).
+    """
+    if indent is None:
+        stream.write('{')
+        for i, (key, value) in enumerate(fields):
+            stream.write(f'{"," if i else ""}{json.dumps(key)}:')
+            _write_json_value(stream, value, indent, depth)
+        stream.write('}')
+        return
+    pad = ' ' * indent
+    stream.write('{')
+    empty = True
+    for key, value in fields:
+        stream.write('\n' if empty else ',\n')
+        empty = False
+        stream.write(f'{pad * (depth + 1)}{json.dumps(key)}: ')
+        _write_json_value(stream, value, indent, depth + 1)
+    stream.write('}' if empty else f'\n{pad * depth}}}')
+
+
+def _write_json_value(stream: TextIO, value: Any, indent: Optional[int], depth: int):
+    if isinstance(value, StreamedObject):
+        write_json_object(stream, value.fields, indent, depth)
+    elif indent is None:
+        if isinstance(value, StreamedArray):
+            stream.write('[')
+            for i, item in enumerate(value.items):
+                if i:
+                    stream.write(',')
+                _write_json_value(stream, item, indent, depth)
+            stream.write(']')
+        else:
+            stream.write(json.dumps(value, separators=(',', ':')))
+    elif isinstance(value, StreamedArray):
+        pad = ' ' * indent
+        empty = True
+        for item in value.items:
+            stream.write('[\n' if empty else ',\n')
+            empty = False
+            stream.write(pad * (depth + 1))
+            _write_json_value(stream, item, indent, depth + 1)
+        stream.write('[]' if empty else f'\n{pad * depth}]')
+    else:
+        # json escapes newlines inside strings, so every newline here is layout
+        pad = ' ' * indent
+        stream.write(json.dumps(value, indent=indent).replace('\n', '\n' + pad * depth))
+
+
+class SpillFile:
+    """JSON-serializable records parked in an anonymous temp file and read back in order.
+
+    Lets a two-pass writer keep per-file results on disk instead of in a
+    list; iterate it as often as needed once all records are appended.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def append(self, record: Any):
+        self._file.seek(0, io.SEEK_END)
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def __iter__(self) -> Iterator[Any]:
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'SpillFile':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# =============================================================================
+# REPORT COMPRESSION
+# =============================================================================
+
+# Supported report compressions and the suffix appended to the file name
+REPORT_COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def _zstandard():
+    """The optional `zstandard` module, imported only when zstd is actually used."""
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)") from None
+    return zstandard
+
+
+@contextmanager
+def open_report(path: Path, compression: Optional[str] = None) -> Iterator[TextIO]:
+    """Text stream writing a report to `path`, compressed on the fly with one of REPORT_COMPRESSIONS."""
+    with open(path, 'wb') as raw:
+        if compression is None:
+            binary = raw
+        elif compression == 'gzip':
+            binary = gzip.GzipFile(fileobj=raw, mode='wb', mtime=0)
+        elif compression == 'zstd':
+            binary = _zstandard().ZstdCompressor(level=10).stream_writer(raw, closefd=False)
+        else:
+            raise ValueError(f"unknown compression: {compression}")
+        stream = io.TextIOWrapper(binary, encoding='utf-8', write_through=True)
+        try:
+            yield stream
+        finally:
+            stream.flush()
+            stream.detach()
+            if binary is not raw:
+                binary.close()
+
+
+def decompress_report(data: bytes) -> bytes:
+    """Undo open_report's compression, detecting it from the data itself."""
+    if data.startswith(_GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(_ZSTD_MAGIC):
+        # Streamed frames carry no content size, which one-shot decompress() requires
+        return _zstandard().ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+# =============================================================================
+# REVIEW HISTORY
+# =============================================================================
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    report TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    project_root TEXT,
+    files_scanned INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY,
+    severity TEXT NOT NULL,
+    type TEXT NOT NULL,
+    message TEXT NOT NULL,
+    UNIQUE (severity, type, message)
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS violations (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    rule_id INTEGER NOT NULL REFERENCES rules (id),
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS violations_by_run ON violations (run_id, file_id, rule_id, line);
+CREATE INDEX IF NOT EXISTS violations_by_rule ON violations (rule_id, run_id);
+"""
+
+# Per (file, rule) occurrence counts of one run, with the lines they were found on
+_RUN_COUNTS = """
+    SELECT file_id, rule_id, COUNT(*) AS n, GROUP_CONCAT(line) AS lines
+    FROM violations WHERE run_id = ? GROUP BY file_id, rule_id
+"""
+
+
+class ReviewHistory:
+    """Append-only SQLite store of review runs, one indexed row per (run, file, rule, line).
+
+    Runs are ingested once (keyed by report name) and never rewritten, so old
+    reports never have to be parsed again. Rules and paths are interned into
+    their own tables, which keeps the violation rows four integers wide.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_HISTORY_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self) -> 'ReviewHistory':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _intern(self, table: str, column_values: Dict[str, Any]) -> int:
+        columns = ', '.join(column_values)
+        where = ' AND '.join(f'{column} = ?' for column in column_values)
+        values = tuple(column_values.values())
+        row = self.db.execute(f'SELECT id FROM {table} WHERE {where}', values).fetchone()
+        if row is not None:
+            return row['id']
+        placeholders = ', '.join('?' for _ in values)
+        return self.db.execute(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', values).lastrowid
+
+    def find_run(self, report: str) -> Optional[int]:
+        row = self.db.execute('SELECT id FROM runs WHERE report = ?', (report,)).fetchone()
+        return row['id'] if row else None
+
+    def ingest(self, report: str, timestamp: str, project_root: Optional[str], rules: List[Dict[str, str]],
+               files: Iterable[Tuple[str, Iterable[Tuple[int, Optional[int]]]]]) -> int:
+        """Store one run and return its id (the existing id if `report` was ingested before).
+
+        `rules` is the run's rule table ({"severity", "type", "message"}) and
+        `files` yields (path, [(index into rules, line or None), ...]).
+        """
+        existing = self.find_run(report)
+        if existing is not None:
+            return existing
+        with self.db:
+            rule_ids = [self._intern('rules', {key: rule[key] for key in ('severity', 'type', 'message')})
+                        for rule in rules]
+            run_id = self.db.execute(
+                'INSERT INTO runs (report, timestamp, project_root, files_scanned) VALUES (?, ?, ?, 0)',
+                (report, timestamp, project_root)).lastrowid
+            scanned = 0
+            for path, violations in files:
+                scanned += 1
+                file_id = self._intern('files', {'path': path})
+                self.db.executemany(
+                    'INSERT INTO violations (run_id, file_id, rule_id, line) VALUES (?, ?, ?, ?)',
+                    [(run_id, file_id, rule_ids[rule], line) for rule, line in violations])
+            self.db.execute('UPDATE runs SET files_scanned = ? WHERE id = ?', (scanned, run_id))
+        return run_id
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """Every run, oldest first, with its violation count."""
+        rows = self.db.execute("""
+            SELECT runs.id, runs.report, runs.timestamp, runs.files_scanned,
+                   (SELECT COUNT(*) FROM violations WHERE violations.run_id = runs.id) AS violations
+            FROM runs ORDER BY runs.timestamp, runs.id
+        """).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_run(self, before: Optional[int] = None) -> Optional[int]:
+        """Id of the newest run, or of the newest run older than run `before`."""
+        if before is None:
+            row = self.db.execute('SELECT id FROM runs ORDER BY timestamp DESC, id DESC LIMIT 1').fetchone()
+        else:
+            row = self.db.execute("""
+                SELECT id FROM runs WHERE (timestamp, id) < (SELECT timestamp, id FROM runs WHERE id = ?)
+                ORDER BY timestamp DESC, id DESC LIMIT 1
+            """, (before,)).fetchone()
+        return row['id'] if row else None
+
+    def diff(self, base: int, head: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Violations new in run `head` and fixed since run `base`.
+
+        Occurrences are compared per (file, rule) by count rather than by line,
+        so code shifting up or down does not show up as fixed-and-reintroduced.
+        Each entry lists the lines of the run it was found in.
+        """
+        for run_id in (base, head):
+            if self.db.execute('SELECT 1 FROM runs WHERE id = ?', (run_id,)).fetchone() is None:
+                raise ValueError(f"no such run: {run_id}")
+        return {'new': self._excess(head, base), 'fixed': self._excess(base, head)}
+
+    def _excess(self, run_id: int, other_id: int) -> List[Dict[str, Any]]:
+        """(file, rule) pairs occurring more often in `run_id` than in `other_id`."""
+        rows = self.db.execute(f"""
+            SELECT files.path, rules.severity, rules.type, rules.message,
+                   this.n - COALESCE(other.n, 0) AS count, this.lines
+            FROM ({_RUN_COUNTS}) AS this
+            LEFT JOIN ({_RUN_COUNTS}) AS other USING (file_id, rule_id)
+            JOIN files ON files.id = this.file_id
+            JOIN rules ON rules.id = this.rule_id
+            WHERE this.n > COALESCE(other.n, 0)
+            ORDER BY files.path, rules.id
+        """, (run_id, other_id)).fetchall()
+        return [
+            {**dict(row), 'lines': sorted(int(line) for line in row['lines'].split(',')) if row['lines'] else []}
+            for row in rows
+        ]
+
+    def trend(self, rule_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Violation count per run and rule, oldest run first (zero counts omitted)."""
+        where = 'WHERE rules.type = ?' if rule_type else ''
+        rows = self.db.execute(f"""
+            SELECT runs.id AS run, runs.timestamp, rules.severity, rules.type, rules.message, counts.n AS count
+            FROM (SELECT run_id, rule_id, COUNT(*) AS n FROM violations GROUP BY rule_id, run_id) AS counts
+            JOIN runs ON runs.id = counts.run_id
+            JOIN rules ON rules.id = counts.rule_id
+            {where}
+            ORDER BY runs.timestamp, runs.id, rules.id
+        """, (rule_type,) if rule_type else ()).fetchall()
+        return [dict(row) for row in rows]
+
+
+# =============================================================================
+# ISSUE TALLIES
+# =============================================================================
+
+@dataclass
+class FileTally:
+    """One file's contribution to an IssueTally."""
+    lines_of_code: int
+    language: Optional[str]
+    issues: int
+    severities: Counter
+    categories: Counter
+
+
+class IssueTally:
+    """Per-severity, per-category and per-file issue counts, kept up to date as results arrive.
+
+    Scores, summaries and recommendations read these counters instead of
+    walking every issue again; `remove()` takes a file back out, so watch
+    mode re-tallies only the files that changed. Issues are anything with
+    `severity` and `category` attributes.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, FileTally] = {}
+        self.lines_of_code = 0
+        self.issues = 0
+        self.files_with_issues = 0
+        self.by_severity: Counter = Counter()
+        self.by_category: Counter = Counter()
+        self.by_language: Counter = Counter()
+
+    def add(self, path: str, issues: Iterable[Any], lines_of_code: int = 0, language: Optional[str] = None):
+        """Count one file's results (replacing any earlier results for the same path)."""
+        self.remove(path)
+        severities: Counter = Counter()
+        categories: Counter = Counter()
+        for issue in issues:
+            severities[issue.severity] += 1
+            categories[issue.category] += 1
+        tally = FileTally(lines_of_code, language, sum(severities.values()), severities, categories)
+        self.files[path] = tally
+        self._apply(tally, 1)
+
+    def remove(self, path: str):
+        tally = self.files.pop(path, None)
+        if tally is not None:
+            self._apply(tally, -1)
+
+    def _apply(self, tally: FileTally, sign: int):
+        self.lines_of_code += sign * tally.lines_of_code
+        self.issues += sign * tally.issues
+        self.files_with_issues += sign * bool(tally.issues)
+        for counts, delta in ((self.by_severity, tally.severities), (self.by_category, tally.categories)):
+            for key, count in delta.items():
+                counts[key] += sign * count
+        if tally.language is not None:
+            self.by_language[tally.language] += sign
+
+    @property
+    def file_count(self) -> int:
+        return len(self.files)
+
+
+# =============================================================================
+# CONSOLE PROGRESS
+# =============================================================================
+
+class ProgressLine:
+    """A "label done/total" counter redrawn in place at most every `interval` seconds.
+
+    Replaces a print per file, which costs more than the scan itself on large
+    trees. Off a terminal only the final count is written; `message()` prints
+    a line of its own (skips, failures) without garbling the counter.
+    """
+
+    def __init__(self, label: str, total: int, stream: Optional[TextIO] = None, interval: float = 0.1):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self.live = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self._drawn_at = 0.0
+
+    def advance(self, count: int = 1):
+        self.done += count
+        if self.live and time.monotonic() - self._drawn_at >= self.interval:
+            self._draw('')
+
+    def message(self, line: str):
+        if self.live:
+            self.stream.write('\r\033[K')
+        self.stream.write(line + '\n')
+        if self.live:
+            self._draw('')
+
+    def close(self):
+        if self.live:
+            self.stream.write('\r\033[K')
+        self._draw('\n')
+
+    def _draw(self, end: str):
+        start = '\r' if self.live else ''
+        self.stream.write(f"{start}{self.label} {self.done}/{self.total}{end}")
+        self.stream.flush()
+        self._drawn_at = time.monotonic()
+
+
+# =============================================================================
+# WATCH MODE
+# =============================================================================
+
+class ChangeWatcher:
+    """Reports batches of changed, created or deleted files under a root.
+
+    Uses Linux inotify (through ctypes, no extra dependency) and falls back to
+    polling mtimes/sizes elsewhere, or for good once the inotify event queue
+    overflows. `skip_dir(name)` prunes directories such as node_modules from
+    both the watch set and the polling walk.
+
+    A directory in a batch means files below it may be gone without events of
+    their own: it was moved away or deleted, or (the root) events were lost
+    and every current file is listed again.
+    """
+
+    _IN_MODIFY = 0x00000002
+    _IN_CLOSE_WRITE = 0x00000008
+    _IN_MOVED_FROM = 0x00000040
+    _IN_MOVED_TO = 0x00000080
+    _IN_CREATE = 0x00000100
+    _IN_DELETE = 0x00000200
+    _IN_DELETE_SELF = 0x00000400
+    _IN_MOVE_SELF = 0x00000800
+    _IN_Q_OVERFLOW = 0x00004000
+    _IN_IGNORED = 0x00008000
+    _IN_ISDIR = 0x40000000
+    _WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+                   | _IN_DELETE_SELF | _IN_MOVE_SELF)
+    _EVENT = struct.Struct('iIII')
+
+    def __init__(self, root: Path, skip_dir: Callable[[str], bool], interval: float = 0.5, debounce: float = 0.05):
+        self.root = Path(root)
+        self.skip_dir = skip_dir
+        self.interval = interval
+        self.debounce = debounce
+        self._fd: Optional[int] = None
+        self._watches: Dict[int, Path] = {}
+        self._snapshot: Dict[Path, Tuple[int, int]] = {}
+        self._libc = None
+        if sys.platform.startswith('linux'):
+            self._start_inotify()
+        if self._fd is None:
+            self._snapshot = self._poll_snapshot()
+
+    @property
+    def backend(self) -> str:
+        return 'inotify' if self._fd is not None else 'polling'
+
+    def _iter_dirs(self, top: Path) -> Iterator[Path]:
+        yield top
+        try:
+            with os.scandir(top) as entries:
+                subdirs = [Path(e.path) for e in entries if e.is_dir(follow_symlinks=False) and not self.skip_dir(e.name)]
+        except OSError:
+            return
+        for subdir in subdirs:
+            yield from self._iter_dirs(subdir)
+
+    def _iter_files(self, top: Path) -> Iterator[Tuple[Path, os.stat_result]]:
+        for directory in self._iter_dirs(top):
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            yield Path(entry.path), entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+    # -- inotify backend --
+
+    def _start_inotify(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+        self._libc, self._fd = libc, fd
+        for directory in self._iter_dirs(self.root):
+            self._add_watch(directory)
+
+    def _add_watch(self, directory: Path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), self._WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = directory
+
+    def _drop_watches(self, top: Path):
+        """Stop watching `top` and everything below it (moved away or deleted)."""
+        for wd, directory in list(self._watches.items()):
+            if directory == top or top in directory.parents:
+                del self._watches[wd]
+                # Fails harmlessly when the kernel already removed the watch with the directory
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read_inotify(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        """Return changed paths from pending events, or None after a queue overflow."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed: Set[Path] = set()
+        while True:
+            try:
+                buffer = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = self._EVENT.unpack_from(buffer, offset)
+                offset += self._EVENT.size
+                name = buffer[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & self._IN_Q_OVERFLOW:
+                    return None
+                if mask & self._IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & (self._IN_DELETE_SELF | self._IN_MOVE_SELF):
+                    # Normally reported by the parent first; this covers the root itself
+                    self._drop_watches(directory)
+                    changed.add(directory)
+                    continue
+                if not name:
+                    continue
+                path = directory / os.fsdecode(name)
+                if mask & self._IN_ISDIR:
+                    if mask & (self._IN_CREATE | self._IN_MOVED_TO) and not self.skip_dir(path.name):
+                        # New directory: watch it and treat its current files as changed
+                        for subdir in self._iter_dirs(path):
+                            self._add_watch(subdir)
+                        changed.update(file_path for file_path, _ in self._iter_files(path))
+                    elif mask & (self._IN_DELETE | self._IN_MOVED_FROM):
+                        # Its watches would follow it to the new location; report the subtree as gone
+                        self._drop_watches(path)
+                        changed.add(path)
+                    continue
+                changed.add(path)
+
+    # -- polling backend --
+
+    def _poll_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        return {path: (st.st_mtime_ns, st.st_size) for path, st in self._iter_files(self.root)}
+
+    def _read_poll(self) -> Set[Path]:
+        time.sleep(self.interval)
+        current = self._poll_snapshot()
+        previous, self._snapshot = self._snapshot, current
+        changed = {path for path, stamp in current.items() if previous.get(path) != stamp}
+        changed.update(path for path in previous if path not in current)
+        return changed
+
+    def changes(self) -> Iterator[Set[Path]]:
+        """Block until files change and yield each debounced batch of paths (deleted ones included)."""
+        while True:
+            if self._fd is None:
+                changed = self._read_poll()
+            else:
+                changed = self._read_inotify(None)
+                # Editors save in several steps; gather the burst into one batch
+                while changed is not None:
+                    more = self._read_inotify(self.debounce)
+                    if more is None:
+                        changed = None
+                    elif not more:
+                        break
+                    else:
+                        changed |= more
+                if changed is None:
+                    # Events were lost, so inotify can no longer say what changed: list every
+                    # file once (plus the root, for deletions) and poll from here on
+                    self.close()
+                    self._snapshot = self._poll_snapshot()
+                    changed = {self.root, *self._snapshot}
+            if changed:
+                yield changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Review Tool Output Tests
+========================
+Checks that code-review's machine-readable formats keep stdout parseable:
+progress messages must go to stderr when the report itself goes to stdout.
+
+Run with `python -m unittest test_review_output` (or pytest).
+"""
+
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+SAMPLE_FILES = {
+    'src/components/Card.tsx': (
+        "import React from 'react';\n"
+        "export const Card = ({ title }: { title: any }) => {\n"
+        "  console.log(title);\n"
+        "  return <button onClick={() => null}>{title}</button>;\n"
+        "};\n"
+    ),
+    'src/utils/format.ts': "export const format = (value: number) => value.toFixed(2);\n",
+}
+
+
+class CodeReviewStdoutTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tree = Path(tempfile.mkdtemp(prefix='review-output-tree-'))
+        for name, text in SAMPLE_FILES.items():
+            path = cls.tree / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding='utf-8')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tree, ignore_errors=True)
+
+    def _run(self, flag: str) -> str:
+        completed = subprocess.run(
+            [sys.executable, str(HERE / 'code-review.py'), str(self.tree), flag],
+            capture_output=True, text=True, encoding='utf-8'
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        return completed.stdout
+
+    def test_ndjson_stdout_is_one_record_per_line(self):
+        lines = self._run('--ndjson').splitlines()
+        self.assertTrue(lines)
+        for number, line in enumerate(lines, 1):
+            with self.subTest(line=number):
+                json.loads(line)
+
+    def test_json_stdout_is_one_document(self):
+        report = json.loads(self._run('--json'))
+        self.assertIsInstance(report, dict)
+
+
+if __name__ == '__main__':
+    unittest.main()